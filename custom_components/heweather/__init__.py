@@ -1,23 +1,54 @@
 import asyncio
 import logging
+from functools import partial
 from typing import Optional
+
 from .heweather.heweather_cert import HeWeatherCert
+from .heweather.heweather_client import HeWeatherClient
 from .heweather.const import (
     DOMAIN,
+    CONF_AUTH_METHOD,
+    CONF_LONGITUDE,
+    CONF_LATITUDE,
+    CONF_HOST,
+    CONF_KEY,
     CONF_STORAGE_PATH,
+    CONF_JWT_SUB,
+    CONF_JWT_KID,
+    CONF_JWT_LIFETIME,
+    CONF_DISASTERLEVEL,
+    CONF_DISASTERMSG,
+    CONF_FORECAST_DAYS,
+    CONF_FORECAST_HOURS,
+    CONF_MINUTELY,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_DAILY_QUOTA,
+    CONF_MINUTE_QUOTA,
+    CONF_RATE_LIMIT,
+    CONF_LOCATION_MODE,
+    CONF_LOCATION_ID,
+    CONF_LOCATION_ID_FOR,
+    DEFAULT_DAILY_QUOTA,
+    DEFAULT_MINUTE_QUOTA,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_LOCATION_MODE,
 )
+from .coordinator import HeWeatherCoordinator, STORAGE_VERSION
+from .quota import async_get_quota, credential_id
+from .engine import async_get_engine
 
 
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
 
 SUPPORTED_PLATFORMS = [Platform.WEATHER, Platform.SENSOR]
 
 _LOGGER = logging.getLogger(__name__)
 
-
 async def cleanup_duplicate_entities_on_startup(hass: HomeAssistant, config_entry: ConfigEntry):
     """在启动时清理重复的实体"""
     entity_registry = er.async_get(hass)
@@ -58,6 +89,39 @@ async def cleanup_duplicate_entities_on_startup(hass: HomeAssistant, config_entr
         _LOGGER.info(f"Cleaned up {len(entities_to_remove)} duplicate entities on startup")
 
 
+async def async_normalize_location(hass: HomeAssistant, config_entry: ConfigEntry, client, host, key,
+                                   quota=None, engine=None, rate_limiter=None):
+    """按配置的位置模式归一化坐标，返回 (经度, 纬度, LocationID).
+
+    round: 坐标保留两位小数（约1公里），附近的位置共用同一份数据；
+    location_id: 在此基础上解析为LocationID，解析结果保存在配置条目中，解析失败时退回round。
+    解析请求与其他接口一样计入额度并受限速和熔断控制。
+    """
+    longitude = config_entry.data.get(CONF_LONGITUDE)
+    latitude = config_entry.data.get(CONF_LATITUDE)
+    mode = config_entry.data.get(CONF_LOCATION_MODE, DEFAULT_LOCATION_MODE)
+    if mode == "exact":
+        return longitude, latitude, None
+    longitude = f"{float(longitude):.2f}"
+    latitude = f"{float(latitude):.2f}"
+    if mode != "location_id":
+        return longitude, latitude, None
+
+    location = f"{longitude},{latitude}"
+    location_id = config_entry.data.get(CONF_LOCATION_ID)
+    if location_id and config_entry.data.get(CONF_LOCATION_ID_FOR) == location:
+        return longitude, latitude, location_id
+    location_id = await HeWeatherCoordinator.async_lookup_location_id(
+        client, host, key, longitude, latitude, quota=quota, engine=engine, rate_limiter=rate_limiter
+    )
+    if location_id:
+        hass.config_entries.async_update_entry(
+            config_entry,
+            data={**config_entry.data, CONF_LOCATION_ID: location_id, CONF_LOCATION_ID_FOR: location},
+        )
+    return longitude, latitude, location_id
+
+
 async def async_setup(hass: HomeAssistant, hass_config: dict) -> bool:
     # pylint: disable=unused-argument
     hass.data.setdefault(DOMAIN, {})
@@ -76,8 +140,93 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         hass.data[DOMAIN]["heweather_cert"] = cert
         _LOGGER.info("create heweather cert instance")
 
+    # 所有配置条目共用一个请求引擎，持有共享会话、合并层和全局工作队列
+    engine = async_get_engine(hass)
+    session = engine.session
+    if config_entry.data.get(CONF_AUTH_METHOD) == "key":
+        key = config_entry.data.get(CONF_KEY)
+        client = HeWeatherClient(session, close_session=False)
+    else:
+        key = None
+        client = HeWeatherClient(
+            session,
+            heweather_cert=cert,
+            jwt_sub=config_entry.data.get(CONF_JWT_SUB),
+            jwt_kid=config_entry.data.get(CONF_JWT_KID),
+            jwt_lifetime=config_entry.data.get(CONF_JWT_LIFETIME),
+            close_session=False,
+        )
+    # 同一KEY或JWT项目的配置条目共用请求额度
+    credential = credential_id(key, config_entry.data.get(CONF_JWT_SUB), config_entry.data.get(CONF_JWT_KID))
+    quota = await async_get_quota(
+        hass,
+        config_entry.entry_id,
+        credential,
+        config_entry.data.get(CONF_DAILY_QUOTA, DEFAULT_DAILY_QUOTA),
+        config_entry.data.get(CONF_MINUTE_QUOTA, DEFAULT_MINUTE_QUOTA),
+    )
+
+    rate_limiter = engine.bucket(credential, config_entry.data.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT))
+
+    host = config_entry.data.get(CONF_HOST)
+    longitude, latitude, location_id = await async_normalize_location(
+        hass, config_entry, client, host, key, quota=quota, engine=engine, rate_limiter=rate_limiter
+    )
+    # 归一化后请求内容完全相同的配置条目共用一个协调器，只请求和解析一次
+    share_key = (
+        longitude, latitude, location_id, host, credential,
+        config_entry.data.get(CONF_FORECAST_DAYS),
+        config_entry.data.get(CONF_FORECAST_HOURS),
+        config_entry.data.get(CONF_MINUTELY, False),
+        config_entry.data.get(CONF_DISASTERMSG),
+        config_entry.data.get(CONF_DISASTERLEVEL),
+        config_entry.data.get(CONF_MIN_INTERVAL),
+        config_entry.data.get(CONF_MAX_INTERVAL),
+    )
+    coordinator = engine.get_shared(share_key)
+    created = coordinator is None
+    if created:
+        # 统一请求所有接口，weather与sensor平台订阅同一份数据；
+        # 协调器由引擎持有，所属条目卸载后交给仍在使用它的条目
+        coordinator = engine.create_coordinator(partial(
+            HeWeatherCoordinator,
+            hass,
+            client,
+            longitude,
+            latitude,
+            host,
+            disastermsg=config_entry.data.get(CONF_DISASTERMSG),
+            disasterlevel=config_entry.data.get(CONF_DISASTERLEVEL),
+            key=key,
+            store_key=f"{DOMAIN}.{config_entry.entry_id}",
+            forecast_days=config_entry.data.get(CONF_FORECAST_DAYS),
+            forecast_hours=config_entry.data.get(CONF_FORECAST_HOURS),
+            minutely=config_entry.data.get(CONF_MINUTELY, False),
+            min_interval=config_entry.data.get(CONF_MIN_INTERVAL),
+            max_interval=config_entry.data.get(CONF_MAX_INTERVAL),
+            quota=quota,
+            rate_limiter=rate_limiter,
+            engine=engine,
+            location_id=location_id,
+        ))
+    else:
+        _LOGGER.debug("Share coordinator of %s with %s", coordinator.location, config_entry.title)
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "client": client,
+        "coordinator": coordinator,
+        "quota": quota,
+    }
+    engine.register(config_entry.entry_id, coordinator, share_key, client)
+    # 有本地缓存时实体先用缓存数据上线
+    if created:
+        await coordinator.async_restore()
+
     await hass.config_entries.async_forward_entry_setups(config_entry, SUPPORTED_PLATFORMS)
-    
+
+    # 实体注册后再在后台进行首次刷新，各位置按相位错开刷新时间，请求并发由引擎的工作队列限制
+    if created:
+        engine.async_schedule_first_refresh(share_key)
+
     # 清理重复的实体（在平台设置完成后）
     await cleanup_duplicate_entities_on_startup(hass, config_entry)
 
@@ -98,14 +247,24 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry, SUPPORTED_PLATFORMS
     )
+    if unload_ok:
+        entry_data = hass.data.get(DOMAIN, {}).pop(config_entry.entry_id, None)
+        if entry_data:
+            await entry_data["client"].async_close()
+            entry_data["quota"].remove_budget(config_entry.entry_id)
+            await async_get_engine(hass).async_unregister(config_entry.entry_id)
 
     return unload_ok
 
 async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
-    heweather_cert: HeWeatherCert = hass.data[DOMAIN]['heweather_cert']
-    
-    await heweather_cert.del_key_async()
+    # 删除该配置条目的本地数据缓存
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{config_entry.entry_id}").async_remove()
 
-    hass.data.pop(DOMAIN, None)
+    # 只清理该条目和证书，共享的请求引擎和额度由其他条目继续使用，最后一个条目卸载时引擎自行关闭
+    domain_data = hass.data.get(DOMAIN, {})
+    domain_data.pop(config_entry.entry_id, None)
+    heweather_cert: Optional[HeWeatherCert] = domain_data.pop('heweather_cert', None)
+    if heweather_cert is not None:
+        await heweather_cert.del_key_async()
 
     return True
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+from .heweather.heweather_client import NOT_MODIFIED
+
+_LOGGER = logging.getLogger(__name__)
+
+# 响应在这么多秒内直接复用，不再请求
+RESPONSE_CACHE_TTL = 60
+# 过期的响应再保留这么多倍的有效期（1天，即最长轮询间隔），用于条件请求返回304时复用
+RESPONSE_KEEP = 24 * 60
+
+
+class RequestCoalescer:
+    """相同请求合并：同一时刻只发出一个请求，短时间内的重复请求直接使用缓存的响应.
+
+    请求以凭据摘要加接口地址为键（接口、位置、语言等都包含在地址中），
+    所有配置条目共用一个实例，使用同一凭据的条目请求同一位置时会合并。
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self._ttl = ttl
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        # 键 -> (获取时间, 响应)，最近一次成功的响应，过期后仍保留用于304
+        self._responses: dict[Hashable, tuple[float, dict]] = {}
+
+    async def async_fetch(
+        self,
+        request_key: Hashable,
+        fetch: Callable[[bool], Awaitable[Optional[dict]]],
+    ) -> Optional[dict]:
+        """获取响应，fetch(conditional) 负责真正的请求，失败时返回None."""
+        cached = self._responses.get(request_key)
+        if cached is not None and time.monotonic() - cached[0] < self._ttl:
+            _LOGGER.debug("Use cached response of %s", request_key)
+            return cached[1]
+
+        task = self._inflight.get(request_key)
+        if task is None:
+            task = asyncio.ensure_future(self._async_fetch(request_key, fetch))
+            self._inflight[request_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(request_key, None))
+        else:
+            _LOGGER.debug("Join in-flight request of %s", request_key)
+        # 某个调用方被取消时不影响其他等待同一请求的调用方
+        return await asyncio.shield(task)
+
+    async def _async_fetch(self, request_key, fetch):
+        cached = self._responses.get(request_key)
+        # 有旧响应时使用条件请求，内容未变化时沿用旧响应
+        json_data = await fetch(cached is not None)
+        if json_data is NOT_MODIFIED:
+            if cached is None:
+                return None
+            json_data = cached[1]
+        if json_data is not None:
+            self._prune()
+            self._responses[request_key] = (time.monotonic(), json_data)
+        return json_data
+
+    def _prune(self) -> None:
+        """写入前清除超过保留时间的响应，已删除的位置不会一直占用内存."""
+        expired = time.monotonic() - self._ttl * RESPONSE_KEEP
+        for request_key in [key for key, (fetched, _) in self._responses.items() if fetched < expired]:
+            del self._responses[request_key]
+
+    def cancel(self) -> None:
+        """取消所有进行中的请求，卸载最后一个配置条目时调用."""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
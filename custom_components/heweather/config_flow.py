@@ -20,22 +20,55 @@ from .heweather.const import (
     CONF_STORAGE_PATH,
     CONF_JWT_SUB,
     CONF_JWT_KID,
+    CONF_JWT_LIFETIME,
     CONF_DISASTERLEVEL,
     CONF_DISASTERMSG,
-    CONF_SENSOR_LIST,
+    CONF_FORECAST_DAYS,
+    CONF_FORECAST_HOURS,
+    CONF_MINUTELY,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_DAILY_QUOTA,
+    CONF_MINUTE_QUOTA,
+    CONF_RATE_LIMIT,
+    CONF_LOCATION_MODE,
+    CONF_LOCATION_ID,
+    CONF_LOCATION_ID_FOR,
     DEFAULT_HOST,
     DEFAULT_AUTH_METHOD,
     AUTH_METHOD,
     DEFAULT_DISASTER_LEVEL_CONF,
     DISASTER_LEVEL_CONF,
     DEFAULT_DISASTER_MSG,
-    DISASTER_MSG
+    DISASTER_MSG,
+    DEFAULT_FORECAST_DAYS,
+    FORECAST_DAYS,
+    DEFAULT_FORECAST_HOURS,
+    FORECAST_HOURS,
+    DEFAULT_MINUTELY,
+    DEFAULT_LOCATION_MODE,
+    LOCATION_MODES,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    MIN_POLL_INTERVAL,
+    MAX_POLL_INTERVAL,
+    DEFAULT_DAILY_QUOTA,
+    DEFAULT_MINUTE_QUOTA,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_JWT_LIFETIME,
+    MIN_JWT_LIFETIME,
+    MAX_JWT_LIFETIME,
 )
 
 from .heweather.heweather_cert import HeWeatherCert
 
 _LOGGER = logging.getLogger(__name__)
 
+POLL_INTERVAL_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL, max=MAX_POLL_INTERVAL))
+QUOTA_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=0))
+RATE_LIMIT_SCHEMA = vol.All(vol.Coerce(float), vol.Range(min=0))
+JWT_LIFETIME_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=MIN_JWT_LIFETIME, max=MAX_JWT_LIFETIME))
+
 async def migrate_entities_for_location_change(hass, config_entry, old_longitude=None, old_latitude=None, new_longitude=None, new_latitude=None):
     """迁移实体到新的经纬度，保持实体ID和配置"""
     if old_longitude is None or old_latitude is None or new_longitude is None or new_latitude is None:
@@ -170,8 +203,18 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     _jwt_pubkey: str
     _jwt_sub: str
     _jwt_kid: str
+    _jwt_lifetime: int
+    _daily_quota: int
+    _minute_quota: int
+    _rate_limit: float
     _longitude: str
     _latitude: str
+    _forecast_days: str
+    _forecast_hours: str
+    _minutely: bool
+    _location_mode: str
+    _min_interval: int
+    _max_interval: int
 
     _disasterlevel: str
     _disastermsg: str
@@ -185,9 +228,19 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._jwt_pubkey = ''
         self._jwt_sub = ''
         self._jwt_kid = ''
+        self._jwt_lifetime = DEFAULT_JWT_LIFETIME
+        self._daily_quota = DEFAULT_DAILY_QUOTA
+        self._minute_quota = DEFAULT_MINUTE_QUOTA
+        self._rate_limit = DEFAULT_RATE_LIMIT
 
         self._longitude = ''
         self._latitude = ''
+        self._forecast_days = DEFAULT_FORECAST_DAYS
+        self._forecast_hours = DEFAULT_FORECAST_HOURS
+        self._minutely = DEFAULT_MINUTELY
+        self._location_mode = DEFAULT_LOCATION_MODE
+        self._min_interval = DEFAULT_MIN_INTERVAL
+        self._max_interval = DEFAULT_MAX_INTERVAL
 
         self._disasterlevel = DEFAULT_DISASTER_LEVEL_CONF
         self._disastermsg = DEFAULT_DISASTER_MSG
@@ -248,6 +301,9 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 self._key = user_input.get("key", self._key)
                 self._host = user_input.get("host", self._host)
+                self._daily_quota = user_input.get("daily_quota", self._daily_quota)
+                self._minute_quota = user_input.get("minute_quota", self._minute_quota)
+                self._rate_limit = user_input.get("rate_limit", self._rate_limit)
                 return await self.async_step_location_config()
         return await self.__show_auth_apikey_config_form("")
 
@@ -262,7 +318,19 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required(
                     "host",
                     default=self._host
-                ): str
+                ): str,
+                vol.Optional(
+                    "daily_quota",
+                    default=self._daily_quota
+                ): QUOTA_SCHEMA,
+                vol.Optional(
+                    "minute_quota",
+                    default=self._minute_quota
+                ): QUOTA_SCHEMA,
+                vol.Optional(
+                    "rate_limit",
+                    default=self._rate_limit
+                ): RATE_LIMIT_SCHEMA
             }),
             errors={'base': reason},
             last_step=False
@@ -281,7 +349,11 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 self._jwt_sub = user_input.get("jwt_sub", self._jwt_sub)
                 self._jwt_kid = user_input.get("jwt_kid", self._jwt_kid)
+                self._jwt_lifetime = user_input.get("jwt_lifetime", self._jwt_lifetime)
                 self._host = user_input.get("host", self._host)
+                self._daily_quota = user_input.get("daily_quota", self._daily_quota)
+                self._minute_quota = user_input.get("minute_quota", self._minute_quota)
+                self._rate_limit = user_input.get("rate_limit", self._rate_limit)
                 return await self.async_step_location_config()
         await self._heweather_cert.gen_key_async()
         self._jwt_pubkey = await self._heweather_cert.get_pub_key_async()
@@ -302,7 +374,23 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required(
                     "host",
                     default=self._host
-                ): str
+                ): str,
+                vol.Optional(
+                    "jwt_lifetime",
+                    default=self._jwt_lifetime
+                ): JWT_LIFETIME_SCHEMA,
+                vol.Optional(
+                    "daily_quota",
+                    default=self._daily_quota
+                ): QUOTA_SCHEMA,
+                vol.Optional(
+                    "minute_quota",
+                    default=self._minute_quota
+                ): QUOTA_SCHEMA,
+                vol.Optional(
+                    "rate_limit",
+                    default=self._rate_limit
+                ): RATE_LIMIT_SCHEMA
             }),
             description_placeholders={
                 "jwt_pubkey": self._jwt_pubkey,
@@ -327,8 +415,19 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             if not validate_latitude(latitude):
                 return await self.__show_location_config_form("invalid_latitude")
 
+            min_interval = user_input.get("min_interval", self._min_interval)
+            max_interval = user_input.get("max_interval", self._max_interval)
+            if min_interval > max_interval:
+                return await self.__show_location_config_form("invalid_interval")
+
             self._longitude = f"{float(longitude):.4f}"
             self._latitude = f"{float(latitude):.4f}"
+            self._forecast_days = user_input.get("forecast_days", self._forecast_days)
+            self._forecast_hours = user_input.get("forecast_hours", self._forecast_hours)
+            self._minutely = user_input.get("minutely", self._minutely)
+            self._location_mode = user_input.get("location_mode", self._location_mode)
+            self._min_interval = min_interval
+            self._max_interval = max_interval
             return await self.async_step_disaster_config()
         return await self.__show_location_config_form("")
 
@@ -344,6 +443,30 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     "latitude",
                     default=self._latitude
                 ): str,
+                vol.Required(
+                    "location_mode",
+                    default=self._location_mode
+                ): vol.In(LOCATION_MODES),
+                vol.Required(
+                    "forecast_days",
+                    default=self._forecast_days
+                ): vol.In(FORECAST_DAYS),
+                vol.Required(
+                    "forecast_hours",
+                    default=self._forecast_hours
+                ): vol.In(FORECAST_HOURS),
+                vol.Required(
+                    "minutely",
+                    default=self._minutely
+                ): bool,
+                vol.Required(
+                    "min_interval",
+                    default=self._min_interval
+                ): POLL_INTERVAL_SCHEMA,
+                vol.Required(
+                    "max_interval",
+                    default=self._max_interval
+                ): POLL_INTERVAL_SCHEMA,
             }),
             errors={'base': reason},
             last_step=False
@@ -384,9 +507,19 @@ class HeWeatherConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 CONF_STORAGE_PATH: self._storage_path,
                 CONF_JWT_SUB: self._jwt_sub,
                 CONF_JWT_KID: self._jwt_kid,
+                CONF_JWT_LIFETIME: self._jwt_lifetime,
+                CONF_DAILY_QUOTA: self._daily_quota,
+                CONF_MINUTE_QUOTA: self._minute_quota,
+                CONF_RATE_LIMIT: self._rate_limit,
                 CONF_HOST: self._host,
                 CONF_LONGITUDE: self._longitude,
                 CONF_LATITUDE: self._latitude,
+                CONF_FORECAST_DAYS: self._forecast_days,
+                CONF_FORECAST_HOURS: self._forecast_hours,
+                CONF_MINUTELY: self._minutely,
+                CONF_LOCATION_MODE: self._location_mode,
+                CONF_MIN_INTERVAL: self._min_interval,
+                CONF_MAX_INTERVAL: self._max_interval,
                 CONF_DISASTERLEVEL: self._disasterlevel,
                 CONF_DISASTERMSG: self._disastermsg,
             })
@@ -407,10 +540,20 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
         self._host = config_entry.data.get(CONF_HOST, DEFAULT_HOST)
         self._jwt_sub = config_entry.data.get(CONF_JWT_SUB, "")
         self._jwt_kid = config_entry.data.get(CONF_JWT_KID, "")
+        self._jwt_lifetime = config_entry.data.get(CONF_JWT_LIFETIME, DEFAULT_JWT_LIFETIME)
+        self._daily_quota = config_entry.data.get(CONF_DAILY_QUOTA, DEFAULT_DAILY_QUOTA)
+        self._minute_quota = config_entry.data.get(CONF_MINUTE_QUOTA, DEFAULT_MINUTE_QUOTA)
+        self._rate_limit = config_entry.data.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT)
         
         # Initialize location and disaster config
         self._longitude = config_entry.data.get(CONF_LONGITUDE, "")
         self._latitude = config_entry.data.get(CONF_LATITUDE, "")
+        self._forecast_days = config_entry.data.get(CONF_FORECAST_DAYS, DEFAULT_FORECAST_DAYS)
+        self._forecast_hours = config_entry.data.get(CONF_FORECAST_HOURS, DEFAULT_FORECAST_HOURS)
+        self._minutely = config_entry.data.get(CONF_MINUTELY, DEFAULT_MINUTELY)
+        self._location_mode = config_entry.data.get(CONF_LOCATION_MODE, DEFAULT_LOCATION_MODE)
+        self._min_interval = config_entry.data.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)
+        self._max_interval = config_entry.data.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
         self._disasterlevel = config_entry.data.get(CONF_DISASTERLEVEL, DEFAULT_DISASTER_LEVEL_CONF)
         self._disastermsg = config_entry.data.get(CONF_DISASTERMSG, DEFAULT_DISASTER_MSG)
 
@@ -457,6 +600,9 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
             # Store auth data and proceed to location config
             self._key = user_input.get("key", "")
             self._host = user_input.get("host", DEFAULT_HOST)
+            self._daily_quota = user_input.get("daily_quota", DEFAULT_DAILY_QUOTA)
+            self._minute_quota = user_input.get("minute_quota", DEFAULT_MINUTE_QUOTA)
+            self._rate_limit = user_input.get("rate_limit", DEFAULT_RATE_LIMIT)
             return await self.async_step_location_config()
 
         return self.async_show_form(
@@ -477,7 +623,19 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
             vol.Required(
                 "host",
                 default=current_host
-            ): str
+            ): str,
+            vol.Optional(
+                "daily_quota",
+                default=self._daily_quota
+            ): QUOTA_SCHEMA,
+            vol.Optional(
+                "minute_quota",
+                default=self._minute_quota
+            ): QUOTA_SCHEMA,
+            vol.Optional(
+                "rate_limit",
+                default=self._rate_limit
+            ): RATE_LIMIT_SCHEMA
         })
 
     async def async_step_auth_jwt_config(self, user_input: Optional[dict] = None):
@@ -509,7 +667,11 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
             # Store auth data and proceed to location config
             self._jwt_sub = user_input.get("jwt_sub", "")
             self._jwt_kid = user_input.get("jwt_kid", "")
+            self._jwt_lifetime = user_input.get("jwt_lifetime", DEFAULT_JWT_LIFETIME)
             self._host = user_input.get("host", DEFAULT_HOST)
+            self._daily_quota = user_input.get("daily_quota", DEFAULT_DAILY_QUOTA)
+            self._minute_quota = user_input.get("minute_quota", DEFAULT_MINUTE_QUOTA)
+            self._rate_limit = user_input.get("rate_limit", DEFAULT_RATE_LIMIT)
             return await self.async_step_location_config()
 
         # Get HeWeather cert instance and public key
@@ -544,6 +706,7 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
         current_jwt_sub = self._config_entry.data.get(CONF_JWT_SUB, "")
         current_jwt_kid = self._config_entry.data.get(CONF_JWT_KID, "")
         current_host = self._config_entry.data.get(CONF_HOST, DEFAULT_HOST)
+        current_jwt_lifetime = self._config_entry.data.get(CONF_JWT_LIFETIME, DEFAULT_JWT_LIFETIME)
         
         return vol.Schema({
             vol.Required(
@@ -557,7 +720,23 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
             vol.Required(
                 "host",
                 default=current_host
-            ): str
+            ): str,
+            vol.Optional(
+                "jwt_lifetime",
+                default=current_jwt_lifetime
+            ): JWT_LIFETIME_SCHEMA,
+            vol.Optional(
+                "daily_quota",
+                default=self._daily_quota
+            ): QUOTA_SCHEMA,
+            vol.Optional(
+                "minute_quota",
+                default=self._minute_quota
+            ): QUOTA_SCHEMA,
+            vol.Optional(
+                "rate_limit",
+                default=self._rate_limit
+            ): RATE_LIMIT_SCHEMA
         })
 
     async def async_step_location_config(self, user_input: Optional[dict] = None):
@@ -588,8 +767,23 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
                     errors={"base": "invalid_latitude"}
                 )
 
+            min_interval = user_input.get("min_interval", self._min_interval)
+            max_interval = user_input.get("max_interval", self._max_interval)
+            if min_interval > max_interval:
+                return self.async_show_form(
+                    step_id="location_config",
+                    data_schema=self._get_location_schema(),
+                    errors={"base": "invalid_interval"}
+                )
+
             self._longitude = f"{float(longitude):.4f}"
             self._latitude = f"{float(latitude):.4f}"
+            self._forecast_days = user_input.get("forecast_days", self._forecast_days)
+            self._forecast_hours = user_input.get("forecast_hours", self._forecast_hours)
+            self._minutely = user_input.get("minutely", self._minutely)
+            self._location_mode = user_input.get("location_mode", self._location_mode)
+            self._min_interval = min_interval
+            self._max_interval = max_interval
             return await self.async_step_disaster_config()
 
         return self.async_show_form(
@@ -611,6 +805,30 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
                 "latitude",
                 default=current_latitude
             ): str,
+            vol.Required(
+                "location_mode",
+                default=self._location_mode
+            ): vol.In(LOCATION_MODES),
+            vol.Required(
+                "forecast_days",
+                default=self._forecast_days
+            ): vol.In(FORECAST_DAYS),
+            vol.Required(
+                "forecast_hours",
+                default=self._forecast_hours
+            ): vol.In(FORECAST_HOURS),
+            vol.Required(
+                "minutely",
+                default=self._minutely
+            ): bool,
+            vol.Required(
+                "min_interval",
+                default=self._min_interval
+            ): POLL_INTERVAL_SCHEMA,
+            vol.Required(
+                "max_interval",
+                default=self._max_interval
+            ): POLL_INTERVAL_SCHEMA,
         })
 
     async def async_step_disaster_config(self, user_input: Optional[dict] = None):
@@ -660,10 +878,26 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
             CONF_STORAGE_PATH: self._config_entry.data.get(CONF_STORAGE_PATH),
             CONF_LONGITUDE: self._longitude,
             CONF_LATITUDE: self._latitude,
+            CONF_FORECAST_DAYS: self._forecast_days,
+            CONF_FORECAST_HOURS: self._forecast_hours,
+            CONF_MINUTELY: self._minutely,
+            CONF_LOCATION_MODE: self._location_mode,
+            CONF_MIN_INTERVAL: self._min_interval,
+            CONF_MAX_INTERVAL: self._max_interval,
+            CONF_DAILY_QUOTA: self._daily_quota,
+            CONF_MINUTE_QUOTA: self._minute_quota,
+            CONF_RATE_LIMIT: self._rate_limit,
             CONF_DISASTERLEVEL: self._disasterlevel,
             CONF_DISASTERMSG: self._disastermsg,
         }
 
+        # 两位小数的位置没有变化时保留已解析的LocationID，重新加载时不必再次查询
+        location_id = self._config_entry.data.get(CONF_LOCATION_ID)
+        location_id_for = self._config_entry.data.get(CONF_LOCATION_ID_FOR)
+        if location_id and location_id_for == f"{float(self._longitude):.2f},{float(self._latitude):.2f}":
+            updated_data[CONF_LOCATION_ID] = location_id
+            updated_data[CONF_LOCATION_ID_FOR] = location_id_for
+
         if self._auth_method == "key":
             # Update API key settings, preserve existing JWT settings
             updated_data.update({
@@ -671,6 +905,7 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
                 CONF_HOST: self._host,
                 CONF_JWT_SUB: self._config_entry.data.get(CONF_JWT_SUB, ""),
                 CONF_JWT_KID: self._config_entry.data.get(CONF_JWT_KID, ""),
+                CONF_JWT_LIFETIME: self._config_entry.data.get(CONF_JWT_LIFETIME, DEFAULT_JWT_LIFETIME),
             })
         else:
             # Update JWT settings, preserve existing API key settings
@@ -679,6 +914,7 @@ class HeWeatherOptionsFlow(config_entries.OptionsFlow):
                 CONF_HOST: self._host,
                 CONF_JWT_SUB: self._jwt_sub,
                 CONF_JWT_KID: self._jwt_kid,
+                CONF_JWT_LIFETIME: self._jwt_lifetime,
             })
 
         # Migrate entities if location changed (更平滑的实体迁移)
@@ -0,0 +1,729 @@
+import logging
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import homeassistant.util.dt as dt_util
+
+from .heweather.const import (
+    DOMAIN,
+    EVENT_ALERT,
+    DEFAULT_DISASTER_LEVEL_CONF,
+    DEFAULT_DISASTER_MSG,
+    DEFAULT_FORECAST_DAYS,
+    DEFAULT_FORECAST_HOURS,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    DISASTER_LEVEL,
+)
+from .heweather.heweather_client import HeWeatherClient
+from .heweather.alerts import Alert, AlertStore
+from .heweather.errors import (
+    HeWeatherError,
+    HeWeatherAuthError,
+    HeWeatherForbiddenError,
+    HeWeatherTokenError,
+    HeWeatherQuotaError,
+    HeWeatherRateLimitError,
+    HeWeatherLocationError,
+)
+from .heweather.forecast import DailyForecast, HourlyForecast, fx_time_iso, resolve_condition, utc_offset_of
+from .scheduler import AdaptiveScheduler
+from .coalescer import RequestCoalescer
+from .engine import RequestExpiredError, remaining_time
+from .quota import credential_id
+from .resilience import RETRY_ATTEMPTS, CircuitBreaker, backoff_delay, is_retryable, request_timeout
+from .ratelimit import DEFAULT_PAUSE, DEFAULT_PRIORITY, ENDPOINT_PRIORITIES
+
+_LOGGER = logging.getLogger(__name__)
+
+# 生活指数 type -> 传感器类型
+INDICES_TYPES = {
+    "1": "sport",
+    "2": "cw",
+    "3": "drsg",
+    "5": "uv",
+    "6": "trav",
+    "7": "guomin",
+    "8": "comf",
+    "9": "flu",
+    "10": "air",
+    "11": "kongtiao",
+    "12": "sunglass",
+    "14": "liangshai",
+    "15": "jiaotong",
+    "16": "fangshai",
+}
+
+AIR_POLLUTANT_CODES = {"pm10", "pm2p5", "co", "no", "no2", "so2", "o3", "nmhc"}
+
+# 未来这么多小时内的逐小时预报有降水时视为即将降水
+PRECIP_LOOKAHEAD_HOURS = 3
+# 降水概率不低于该值时视为即将降水
+PRECIP_POP_THRESHOLD = 50
+
+# 一次刷新（含排队、重试和等待）最多花费的时间（秒），超时未完成的接口本次放弃
+REFRESH_BUDGET = 45
+
+# 额度或余额不足（402）时推迟的时间
+QUOTA_ERROR_DEFER = timedelta(hours=1)
+# LocationID解析失败后这么多秒内不再重试，期间按坐标请求
+LOOKUP_RETRY_INTERVAL = 6 * 3600
+
+# 本地缓存：每个配置条目一个文件，保存各接口最近一次成功的原始数据
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+# 缓存中不需要的字段，写入前剔除
+STORAGE_STRIP_KEYS = ("refer", "fxLink")
+
+
+class HeWeatherCoordinator(DataUpdateCoordinator):
+    """一个位置的所有和风天气接口由同一个协调器负责请求和解析."""
+
+    def __init__(self, hass: HomeAssistant, client: HeWeatherClient, longitude, latitude, host,
+                 disastermsg=None, disasterlevel=None, key=None, store_key=None,
+                 forecast_days=None, forecast_hours=None, minutely=False,
+                 min_interval=None, max_interval=None, quota=None, engine=None, location_id=None,
+                 rate_limiter=None):
+        """初始化函数."""
+        min_interval = timedelta(seconds=min_interval or DEFAULT_MIN_INTERVAL)
+        max_interval = timedelta(seconds=max_interval or DEFAULT_MAX_INTERVAL)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{longitude}_{latitude}",
+            update_interval=min_interval,
+        )
+        self._client = client
+        self._location = f"{longitude},{latitude}"
+        self._disastermsg = disastermsg or DEFAULT_DISASTER_MSG
+        self._disasterlevel = disasterlevel or DEFAULT_DISASTER_LEVEL_CONF
+
+        forecast_days = forecast_days or DEFAULT_FORECAST_DAYS
+        forecast_hours = forecast_hours or DEFAULT_FORECAST_HOURS
+        # 预报条数，"15d" -> 15，"168h" -> 168
+        self.horizons = {
+            "daily": int(forecast_days[:-1]),
+            "hourly": int(forecast_hours[:-1]),
+        }
+
+        # 有LocationID时v7接口按LocationID请求，v1接口和分钟级降水只支持坐标
+        location = location_id or self._location
+        paths = {
+            "now": "/v7/weather/now?location=" + location,
+            "daily": "/v7/weather/" + forecast_days + "?location=" + location,
+            "hourly": "/v7/weather/" + forecast_hours + "?location=" + location,
+            "air": "/airquality/v1/current/" + latitude + "/" + longitude,
+            "alert": "/weatheralert/v1/current/" + latitude + "/" + longitude,
+            "indices": "/v7/indices/1d?location=" + location + "&type=0",
+        }
+        self._parsers = {
+            "now": self._parse_now,
+            "daily": self._parse_daily,
+            "hourly": self._parse_hourly,
+            "air": self._parse_air,
+            "alert": self._parse_alert,
+            "indices": self._parse_indices,
+        }
+        if minutely:
+            paths["minutely"] = "/v7/minutely/5m?location=" + self._location
+            self._parsers["minutely"] = self._parse_minutely
+        self._urls = {endpoint: self._build_url(host, path, key) for endpoint, path in paths.items()}
+        # 合并请求的键包含凭据摘要：失败（认证、额度等）和额度消耗都属于具体凭据，不能由其他凭据的条目共用
+        credential = quota.credential if quota is not None else credential_id(key)
+        self._request_keys = {endpoint: f"{credential}@{host}{path}" for endpoint, path in paths.items()}
+        # 配置条目的协调器经共享的请求引擎排队请求，YAML方式没有引擎时直接请求
+        self._engine = engine
+        self._coalescer = engine.coalescer if engine is not None else RequestCoalescer()
+        # 熔断器按主机和接口划分，有引擎时所有配置条目共用
+        self._breakers = {
+            endpoint: engine.breaker(host, endpoint) if engine is not None else CircuitBreaker(f"{host} {endpoint}")
+            for endpoint in paths
+        }
+        # 各接口的刷新时间由调度器根据数据发布时间和天气变化决定
+        self._scheduler = AdaptiveScheduler(self._urls, min_interval, max_interval)
+        # 同一凭据的所有配置条目共用的请求额度
+        self.quota = quota
+        # 同一凭据的所有配置条目共用的令牌桶，限制请求速度
+        self.rate_limiter = rate_limiter
+        self._parsed: dict = {}
+        # 最近一次刷新中成功更新的接口，实体据此判断自己的数据是否变化
+        self.updated_endpoints: set[str] = set()
+        # 从本地缓存恢复、且尚未重新获取成功的过期接口
+        self.stale_endpoints: set[str] = set()
+        # 当前生效的预警，按 id 与上一次比较后触发 heweather_alert 事件
+        self._alert_store = AlertStore()
+        # 认证失败后停止轮询，重新配置后恢复
+        self.auth_error: HeWeatherAuthError | None = None
+        # 返回403的接口按最长间隔重试，期间其实体不可用，其他接口照常刷新
+        self.forbidden_endpoints: set[str] = set()
+        # 接口 -> 连续解析失败的次数，解析失败的接口按次数加倍推迟
+        self._parse_failures: dict[str, int] = {}
+
+        self._payloads: dict[str, dict] = {}
+        # 各接口已解析数据的版本（updateTime 或 metadata.tag），版本不变时跳过解析
+        self._versions: dict[str, str] = {}
+        self._store = None
+        if store_key is not None:
+            self._store = Store(hass, STORAGE_VERSION, store_key, atomic_writes=True)
+
+    @staticmethod
+    def _build_url(host, path, key):
+        url = "https://" + host + path
+        if key is not None:
+            url += ("&" if "?" in path else "?") + "key=" + key
+        return url
+
+    @classmethod
+    async def async_lookup_location_id(cls, client: HeWeatherClient, host, key, longitude, latitude,
+                                       quota=None, engine=None, rate_limiter=None):
+        """通过城市搜索接口把坐标解析为LocationID，失败时返回None.
+
+        与其他接口一样计入额度、经令牌桶和引擎的工作队列请求并受熔断器控制；
+        解析失败后 LOOKUP_RETRY_INTERVAL 秒内不再重试，重新加载配置条目也不会重复请求。
+        """
+        path = f"/geo/v2/city/lookup?location={longitude},{latitude}&number=1"
+        url = cls._build_url(host, path, key)
+        credential = quota.credential if quota is not None else credential_id(key)
+        request_key = f"{credential}@{host}{path}"
+        failures = engine.lookup_failures if engine is not None else {}
+        failed = failures.get(request_key)
+        if failed is not None and time.monotonic() - failed < LOOKUP_RETRY_INTERVAL:
+            _LOGGER.debug("LocationID of %s,%s failed recently, skip lookup", longitude, latitude)
+            return None
+
+        breaker = engine.breaker(host, "geo") if engine is not None else None
+        if breaker is not None and not breaker.allow():
+            _LOGGER.debug("Circuit %s is open, skip LocationID lookup", breaker.name)
+            return None
+        if quota is not None and not quota.try_acquire():
+            if breaker is not None:
+                breaker.release()
+            _LOGGER.debug("Request quota exhausted, skip LocationID lookup of %s,%s", longitude, latitude)
+            return None
+
+        def request(remaining):
+            return client.async_get_json(url, timeout=request_timeout("geo", remaining))
+
+        priority = ENDPOINT_PRIORITIES.get("geo", DEFAULT_PRIORITY)
+        # 排队和请求与一次刷新共用同样的时间上限
+        deadline = asyncio.get_running_loop().time() + REFRESH_BUDGET
+        try:
+            if engine is not None:
+                json_data = await engine.async_run(request, priority=priority, bucket=rate_limiter, deadline=deadline)
+            else:
+                if rate_limiter is not None:
+                    try:
+                        await rate_limiter.async_acquire(priority, remaining_time(deadline))
+                    except asyncio.TimeoutError:
+                        raise RequestExpiredError from None
+                json_data = await request(remaining_time(deadline))
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release()
+            raise
+        except RequestExpiredError:
+            if breaker is not None:
+                breaker.release()
+            if quota is not None:
+                quota.release()
+            _LOGGER.warning("LocationID lookup of %s,%s not sent in time", longitude, latitude)
+            return None
+        except (asyncio.TimeoutError, aiohttp.ClientError, HeWeatherError) as e:
+            if breaker is not None:
+                # 与请求接口时相同：本地签发失败不计入熔断，服务端有响应的错误视为接口正常
+                if isinstance(e, HeWeatherTokenError):
+                    breaker.release()
+                elif is_retryable(e):
+                    breaker.record_failure(e)
+                else:
+                    breaker.record_success()
+            failures[request_key] = time.monotonic()
+            _LOGGER.warning("Cannot resolve LocationID of %s,%s, %s", longitude, latitude, repr(e))
+            return None
+        if breaker is not None:
+            breaker.record_success()
+        if not json_data.get("location"):
+            failures[request_key] = time.monotonic()
+            _LOGGER.warning("Cannot resolve LocationID of %s,%s, no result", longitude, latitude)
+            return None
+        failures.pop(request_key, None)
+        return json_data["location"][0]["id"]
+
+    @property
+    def minutely_enabled(self):
+        """是否请求分钟级降水."""
+        return "minutely" in self._urls
+
+    def set_phase(self, phase):
+        """设置刷新相位（0~1），由请求引擎为每个位置分配."""
+        self._scheduler.phase = phase
+
+    @property
+    def alert_detail(self):
+        """预警是否包含正文，订阅标题时只保留标题."""
+        return self._disastermsg != "title"
+
+    @property
+    def location(self):
+        """经纬度，格式为 经度,纬度."""
+        return self._location
+
+    async def async_restore(self) -> bool:
+        """从本地缓存恢复各接口上次成功的数据，未超过刷新间隔的接口不再立即请求."""
+        if self._store is None:
+            return False
+        stored = await self._store.async_load()
+        if not stored:
+            return False
+
+        now = dt_util.utcnow()
+        restored = set()
+        for endpoint, payload in stored.get("payloads", {}).items():
+            if endpoint not in self._parsers:
+                continue
+            fetched = dt_util.parse_datetime(payload.get("time", ""))
+            try:
+                parsed = self._parsers[endpoint](payload["data"])
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                _LOGGER.debug("Discard cached %s of %s, %s", endpoint, self._location, e)
+                continue
+            # 修改预报时长后，旧时长的缓存作废
+            if endpoint in self.horizons and len(parsed[endpoint]) < self.horizons[endpoint]:
+                _LOGGER.debug("Discard cached %s of %s, horizon changed", endpoint, self._location)
+                continue
+            self._parsed.update(parsed)
+            self._payloads[endpoint] = payload
+            self._versions[endpoint] = self._payload_version(payload["data"])
+            restored.add(endpoint)
+            if not self._scheduler.restore(endpoint, fetched, now):
+                self.stale_endpoints.add(endpoint)
+
+        if not restored:
+            return False
+        # 恢复的预警作为比较的基准，重启后不会把已有预警当作新预警
+        if "alert" in self._parsed:
+            self._alert_store.load(self._parsed["alert"], now)
+            current = tuple(self._alert_store.alerts.values())
+            self._parsed["alert"] = current
+            self._parsed["alert_active"] = bool(current)
+        self.update_interval = self._scheduler.next_refresh(now)
+        self.updated_endpoints = restored
+        self.data = dict(self._parsed)
+        _LOGGER.debug("Restored %s of %s from cache, stale: %s", restored, self._location, self.stale_endpoints)
+        return True
+
+    @staticmethod
+    def _payload_version(json_data):
+        """v7接口使用updateTime，v1接口使用metadata.tag作为数据版本."""
+        metadata = json_data.get("metadata")
+        if isinstance(metadata, dict) and metadata.get("tag"):
+            return metadata["tag"]
+        return json_data.get("updateTime")
+
+    @staticmethod
+    def _compact(json_data):
+        return {k: v for k, v in json_data.items() if k not in STORAGE_STRIP_KEYS}
+
+    @property
+    def store_key(self):
+        return self._store.key if self._store is not None else None
+
+    async def async_move_store(self, store_key):
+        """改用另一个存储键，立即写入新存储并删除旧文件.
+
+        共享的协调器以创建它的配置条目命名存储，该条目卸载后交给仍在使用的条目，
+        避免已删除的缓存文件在之后的延迟保存中被重新写回。
+        """
+        if self._store is None or self._store.key == store_key:
+            return
+        old_store = self._store
+        self._store = Store(self.hass, STORAGE_VERSION, store_key, atomic_writes=True)
+        if self._payloads:
+            await self._store.async_save(self._data_to_store())
+        await old_store.async_remove()
+
+    async def async_hand_over(self, client: HeWeatherClient, store_key):
+        """共享协调器的所属条目卸载后，改用仍在使用它的条目的客户端和存储."""
+        self._client = client
+        await self.async_move_store(store_key)
+
+    async def async_flush_store(self):
+        """立即写入尚未保存的数据并取消延迟保存，协调器不再使用时调用."""
+        if self._store is not None and self._payloads:
+            await self._store.async_save(self._data_to_store())
+
+    def _data_to_store(self):
+        return {"payloads": self._payloads}
+
+    @staticmethod
+    def _published_time(json_data):
+        """数据的发布时间，v1接口没有updateTime时返回None."""
+        update_time = json_data.get("updateTime")
+        if not update_time:
+            return None
+        try:
+            return datetime.fromisoformat(fx_time_iso(update_time))
+        except ValueError:
+            return None
+
+    def _volatile(self):
+        """有生效的预警或近几小时有降水时，天气视为不稳定."""
+        if self._parsed.get("alert_active"):
+            return True
+        minutely = self._parsed.get("minutely")
+        if minutely is not None and minutely["rain_time"] is not None:
+            return True
+        for hour in (self._parsed.get("hourly") or ())[:PRECIP_LOOKAHEAD_HOURS]:
+            if hour.precip > 0 or (hour.pop is not None and hour.pop >= PRECIP_POP_THRESHOLD):
+                return True
+        return False
+
+    async def _async_request(self, endpoint, url, conditional, deadline):
+        """请求接口，取得令牌和排队都不超过 deadline，真正发出时才按剩余时间计算超时."""
+        priority = ENDPOINT_PRIORITIES.get(endpoint, DEFAULT_PRIORITY)
+
+        def request(remaining):
+            # 已有该接口数据时使用条件请求，未变化的内容不再传输
+            return self._client.async_get_json(
+                url, conditional=conditional, timeout=request_timeout(endpoint, remaining)
+            )
+
+        if self._engine is not None:
+            return await self._engine.async_run(
+                request, priority=priority, bucket=self.rate_limiter, deadline=deadline
+            )
+        if self.rate_limiter is not None:
+            try:
+                await self.rate_limiter.async_acquire(priority, remaining_time(deadline))
+            except asyncio.TimeoutError:
+                raise RequestExpiredError from None
+        return await request(remaining_time(deadline))
+
+    async def _async_fetch(self, endpoint, deadline):
+        """请求单个接口，失败时返回None；相同的请求经合并层只发出一次.
+
+        超时、连接错误和服务端错误按指数退避加随机抖动重试，接口连续失败后由熔断器暂停请求；
+        认证、额度、限流和位置错误不重试，抛出 HeWeatherError 由刷新流程处理；
+        deadline 为本次刷新的截止时间（事件循环时间），每次请求的超时和重试都不超过它。
+        """
+        url = self._urls[endpoint]
+        request_key = self._request_keys[endpoint]
+        breaker = self._breakers[endpoint]
+        loop = asyncio.get_running_loop()
+
+        async def fetch(conditional):
+            for attempt in range(RETRY_ATTEMPTS):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    _LOGGER.warning("Refresh budget of %s exhausted, skip %s", self._location, endpoint)
+                    return None
+                if not breaker.allow():
+                    _LOGGER.debug("Circuit %s is open, skip %s", breaker.name, self._location)
+                    return None
+                if self.quota is not None and not self.quota.try_acquire():
+                    breaker.release()
+                    # 每天只在第一次超出额度时警告，之后的跳过只记调试日志
+                    log = _LOGGER.warning if self.quota.rejected_today == 1 else _LOGGER.debug
+                    log("Request quota exhausted, skip %s of %s", endpoint, self._location)
+                    return None
+                try:
+                    result = await self._async_request(endpoint, url, conditional, deadline)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except RequestExpiredError:
+                    # 截止时间前没有取得令牌或没有轮到，请求没有发出，退回额度
+                    breaker.release()
+                    if self.quota is not None:
+                        self.quota.release()
+                    _LOGGER.warning("Refresh budget of %s exhausted while %s was queued", self._location, endpoint)
+                    return None
+                except (asyncio.TimeoutError, aiohttp.ClientError, HeWeatherError) as e:
+                    if not is_retryable(e):
+                        # 服务端有响应，只是请求本身有问题，不计入熔断
+                        breaker.record_success()
+                        if isinstance(e, HeWeatherRateLimitError) and self.rate_limiter is not None:
+                            # 同一凭据的其他请求也一起暂停
+                            self.rate_limiter.pause(e.retry_after or DEFAULT_PAUSE)
+                        if isinstance(e, HeWeatherError):
+                            raise
+                        _LOGGER.error("Error while accessing: %s, %s", request_key, e)
+                        return None
+                    if isinstance(e, HeWeatherTokenError):
+                        # 本地签发令牌失败，与服务端无关，不计入熔断
+                        breaker.release()
+                    else:
+                        breaker.record_failure(e)
+                    if attempt + 1 >= RETRY_ATTEMPTS:
+                        _LOGGER.error("Error while accessing: %s, %s", request_key, repr(e))
+                        return None
+                    delay = backoff_delay(attempt)
+                    if loop.time() + delay >= deadline:
+                        _LOGGER.error("Error while accessing: %s, %s", request_key, repr(e))
+                        return None
+                    _LOGGER.debug("Retry %s in %.1f s, %s", request_key, delay, repr(e))
+                    await asyncio.sleep(delay)
+                else:
+                    breaker.record_success()
+                    return result
+            return None
+
+        return await self._coalescer.async_fetch(request_key, fetch)
+
+    def diagnostics(self) -> dict:
+        """调度、额度和熔断器的当前状态，供诊断信息使用."""
+        return {
+            "intervals": {
+                endpoint: interval.total_seconds() for endpoint, interval in self._scheduler.intervals.items()
+            },
+            "last_fetch": {
+                endpoint: fetched.isoformat() for endpoint, fetched in self._scheduler.last_fetch.items()
+            },
+            "stale_endpoints": sorted(self.stale_endpoints),
+            "auth_error": str(self.auth_error) if self.auth_error is not None else None,
+            "forbidden_endpoints": sorted(self.forbidden_endpoints),
+            "quota": self.quota.as_dict() if self.quota is not None else None,
+            "breakers": {endpoint: breaker.as_dict() for endpoint, breaker in self._breakers.items()},
+            "rate_limiter": self.rate_limiter.as_dict() if self.rate_limiter is not None else None,
+        }
+
+    async def _async_update_data(self):
+        """只请求已到刷新时间的接口，各接口失败互不影响."""
+        now = dt_util.utcnow()
+        self.updated_endpoints = set()
+        # 预留一点余量，避免调度抖动导致接口被推迟一整个周期
+        endpoints = self._scheduler.due(now + timedelta(seconds=5))
+        # 整次刷新有时间上限，卡住的接口不会拖住协调器或HA的关闭
+        deadline = asyncio.get_running_loop().time() + REFRESH_BUDGET
+        tasks = [asyncio.ensure_future(self._async_fetch(endpoint, deadline)) for endpoint in endpoints]
+        results = []
+        if tasks:
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=REFRESH_BUDGET)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+            if pending:
+                abandoned = [endpoint for endpoint, task in zip(endpoints, tasks) if task in pending]
+                _LOGGER.warning("Refresh of %s exceeded %s s, abandon %s", self._location, REFRESH_BUDGET, abandoned)
+            for endpoint, task in zip(endpoints, tasks):
+                if task not in done or task.cancelled():
+                    # 超时放弃或在别处被取消的请求没有结果，task.exception() 会抛出 CancelledError
+                    results.append(None)
+                elif isinstance(task.exception(), HeWeatherError):
+                    # 错误的响应不解析，只推迟该接口，其他接口的数据照常更新
+                    self._handle_error(endpoint, task.exception(), now)
+                    results.append(None)
+                else:
+                    results.append(task.result())
+
+        updated = set()
+        fetched = {}
+        # 从缓存恢复的过期接口重新获取成功，内容即使未变也要通知实体清除过期标记
+        refreshed = set()
+        for endpoint, json_data in zip(endpoints, results):
+            if json_data is None:
+                continue
+            self.forbidden_endpoints.discard(endpoint)
+            # 304 或合并层缓存的响应内容与上次相同，版本不变时跳过解析
+            version = self._payload_version(json_data)
+            if version is None or version != self._versions.get(endpoint):
+                try:
+                    self._parsed.update(self._parsers[endpoint](json_data))
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    # 数据格式不变时重新请求仍会失败，加倍推迟，只有第一次记为错误
+                    failures = self._parse_failures.get(endpoint, 0) + 1
+                    self._parse_failures[endpoint] = failures
+                    log = _LOGGER.error if failures == 1 else _LOGGER.warning
+                    log("Error while parsing %s: %s", self._request_keys[endpoint], e)
+                    self._scheduler.back_off(endpoint, now, failures)
+                    continue
+                self._parse_failures.pop(endpoint, None)
+                self._versions[endpoint] = version
+                self._payloads[endpoint] = {"data": self._compact(json_data)}
+                updated.add(endpoint)
+            else:
+                _LOGGER.debug("%s of %s unchanged, skip parsing", endpoint, self._location)
+            self._payloads[endpoint]["time"] = now.isoformat()
+            if endpoint in self.stale_endpoints:
+                self.stale_endpoints.discard(endpoint)
+                refreshed.add(endpoint)
+            fetched[endpoint] = self._published_time(self._payloads[endpoint]["data"])
+
+        if "alert" in fetched and "alert" in self._parsed and self._update_alerts(now):
+            updated.add("alert")
+
+        # 先解析完所有接口，再根据最新数据安排各接口的下一次请求
+        volatile = self._volatile()
+        minutely = self._parsed.get("minutely")
+        rain_time = minutely["rain_time"] if minutely is not None else None
+        stretch = self.quota.stretch_factor(now) if self.quota is not None else 1.0
+        for endpoint, published in fetched.items():
+            self._scheduler.record(
+                endpoint, now, endpoint in updated,
+                published=published, volatile=volatile, rain_time=rain_time, stretch=stretch,
+            )
+        self.update_interval = self._scheduler.next_refresh(now)
+        if self.auth_error is not None:
+            # 不再安排刷新，已有数据保留
+            self.update_interval = None
+
+        self.updated_endpoints = updated | refreshed
+        if fetched and self._store is not None:
+            self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+        if endpoints and not updated and not self._parsed:
+            raise UpdateFailed(f"Error while updating heweather data: {self._location}")
+        return dict(self._parsed)
+
+    def _handle_error(self, endpoint, error, now):
+        """按错误类型调整调度：认证失败停止轮询，额度不足和限流推迟所有接口，无权访问和位置错误只推迟该接口."""
+        request_key = self._request_keys[endpoint]
+        if isinstance(error, HeWeatherAuthError):
+            if self.auth_error is None:
+                _LOGGER.error(
+                    "Authentication failed for %s (%s), polling of %s stopped until the entry is reconfigured",
+                    request_key, error, self._location,
+                )
+            self.auth_error = error
+        elif isinstance(error, HeWeatherForbiddenError):
+            if endpoint not in self.forbidden_endpoints:
+                _LOGGER.warning(
+                    "Access to %s denied (%s), %s unavailable for %s",
+                    request_key, error, endpoint, self._location,
+                )
+            self.forbidden_endpoints.add(endpoint)
+            self._scheduler.defer(endpoint, now)
+        elif isinstance(error, (HeWeatherQuotaError, HeWeatherRateLimitError)):
+            if isinstance(error, HeWeatherRateLimitError):
+                # 没有 Retry-After 时与令牌桶暂停同样的时间
+                delay = timedelta(seconds=error.retry_after or DEFAULT_PAUSE)
+            else:
+                delay = QUOTA_ERROR_DEFER
+            _LOGGER.warning("%s for %s, defer all endpoints of %s by %s", error, request_key, self._location, delay)
+            for other in self._scheduler.intervals:
+                self._scheduler.defer(other, now, delay)
+        elif isinstance(error, HeWeatherLocationError):
+            _LOGGER.warning("No data of %s (%s), defer it", request_key, error)
+            self._scheduler.defer(endpoint, now)
+        else:
+            _LOGGER.error("Error while accessing: %s, %s", request_key, error)
+
+    @staticmethod
+    def _parse_now(json_data):
+        """解析实时天气."""
+        weather = json_data["now"]
+        return {
+            "now": weather,
+            "obs_time": datetime.fromisoformat(fx_time_iso(weather["obsTime"])),
+            "condition": resolve_condition(weather["text"], weather.get("icon")),
+        }
+
+    def _parse_daily(self, json_data):
+        """解析逐天预报，只保留所配置的天数，更长的缓存数据不会推送给订阅者."""
+        # fxDate 不带时区，使用 updateTime 中的当地时区偏移
+        utc_offset = utc_offset_of(json_data.get("updateTime"))
+        days = json_data["daily"][:self.horizons["daily"]]
+        return {"daily": tuple(DailyForecast.from_json(day, utc_offset) for day in days)}
+
+    def _parse_hourly(self, json_data):
+        """解析逐小时预报，只保留所配置的小时数."""
+        hours = json_data["hourly"][:self.horizons["hourly"]]
+        return {"hourly": tuple(HourlyForecast.from_json(hour) for hour in hours)}
+
+    @staticmethod
+    def _parse_air(json_data):
+        """解析空气质量."""
+        # AQI (CN) code: cn-mee
+        air_index = next((item for item in json_data["indexes"] if item["code"] == "cn-mee"), None)
+        air = {
+            "qlty": air_index["aqiDisplay"],
+            "level": air_index["level"],
+            "category": air_index["category"],
+        }
+        primary_pollutant = air_index["primaryPollutant"]
+        if primary_pollutant is not None and "name" in primary_pollutant:
+            air["primary"] = primary_pollutant["name"]
+
+        for pollutant in json_data["pollutants"]:
+            code = pollutant["code"]
+            if code in AIR_POLLUTANT_CODES:
+                air[code] = pollutant["concentration"]["value"]
+                # 新 API 单位不固定，动态获取
+                air[f"{code}_unit"] = pollutant["concentration"]["unit"]
+        return {"air": air}
+
+    def _parse_alert(self, json_data):
+        """解析灾害预警，只保留不低于订阅等级的预警."""
+        disaster_warn = json_data["alerts"]
+
+        # Normalize disaster_warn into a list for safe iteration
+        if disaster_warn is None:
+            alerts = []
+        elif isinstance(disaster_warn, dict):
+            alerts = [disaster_warn]
+        elif isinstance(disaster_warn, list):
+            alerts = disaster_warn
+        else:
+            # Unexpected type: try to coerce to list if possible, else empty
+            try:
+                alerts = list(disaster_warn)
+            except Exception:
+                alerts = []
+
+        level = int(self._disasterlevel)
+        subscribed = []
+        for i in alerts:
+            alert = Alert.from_json(i)
+            if alert.severity in DISASTER_LEVEL and DISASTER_LEVEL[alert.severity] >= level:
+                subscribed.append(alert)
+        return {"alert": tuple(subscribed), "alert_active": bool(subscribed)}
+
+    def _update_alerts(self, now):
+        """与上一次的预警比较，每条新增、更新或解除的预警触发一个事件；有变化时返回True."""
+        new, updated, expired = self._alert_store.update(self._parsed["alert"], now)
+        current = tuple(self._alert_store.alerts.values())
+        self._parsed["alert"] = current
+        self._parsed["alert_active"] = bool(current)
+        for change, alerts in (("new", new), ("updated", updated), ("expired", expired)):
+            for alert in alerts:
+                _LOGGER.debug("Alert %s of %s %s", alert.id, self._location, change)
+                self.hass.bus.async_fire(EVENT_ALERT, {
+                    "change": change,
+                    "location": self._location,
+                    **alert.as_dict(),
+                })
+        return bool(new or updated or expired)
+
+    @staticmethod
+    def _parse_indices(json_data):
+        """解析生活指数."""
+        indices = {"updatetime": json_data["updateTime"]}
+        for i in json_data["daily"]:
+            option = INDICES_TYPES.get(i["type"])
+            if option is not None:
+                indices[option] = [i["category"], i["text"]]
+        return {"indices": indices}
+
+    @staticmethod
+    def _parse_minutely(json_data):
+        """解析分钟级降水，记录第一次出现降水的时间."""
+        series = []
+        rain_time = None
+        for item in json_data["minutely"]:
+            precip = float(item["precip"])
+            time = fx_time_iso(item["fxTime"])
+            if rain_time is None and precip > 0:
+                rain_time = datetime.fromisoformat(time)
+            series.append({"time": time, "precip": precip, "type": item.get("type")})
+        return {"minutely": {
+            "summary": json_data.get("summary"),
+            "series": series,
+            "rain_time": rain_time,
+        }}
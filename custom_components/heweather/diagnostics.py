@@ -0,0 +1,34 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .heweather.const import (
+    DOMAIN,
+    CONF_KEY,
+    CONF_JWT_SUB,
+    CONF_JWT_KID,
+    CONF_LONGITUDE,
+    CONF_LATITUDE,
+    CONF_LOCATION_ID,
+    CONF_LOCATION_ID_FOR,
+)
+
+# 凭据和位置不出现在诊断信息中
+TO_REDACT = {
+    CONF_KEY,
+    CONF_JWT_SUB,
+    CONF_JWT_KID,
+    CONF_LONGITUDE,
+    CONF_LATITUDE,
+    CONF_LOCATION_ID,
+    CONF_LOCATION_ID_FOR,
+}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """配置条目的诊断信息：配置、各接口的刷新间隔、请求额度和熔断器状态."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    return {
+        "entry": async_redact_data(dict(config_entry.data), TO_REDACT),
+        "coordinator": coordinator.diagnostics(),
+    }
@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import logging
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from homeassistant.config_entries import current_entry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from .heweather.const import DOMAIN
+from .coalescer import RequestCoalescer
+from .resilience import CircuitBreaker
+from .ratelimit import DEFAULT_PRIORITY, TokenBucket
+
+_LOGGER = logging.getLogger(__name__)
+
+# 所有配置条目同时进行的请求数量上限
+MAX_CONCURRENT_REQUESTS = 8
+# 各位置的刷新相位按黄金分割序列分配，任意数量的位置都能大致均匀地分布
+PHASE_STEP = 0.6180339887
+# 首次刷新按相位错开的时间窗口（秒）
+STAGGER_WINDOW = 60
+
+
+class RequestExpiredError(asyncio.TimeoutError):
+    """请求在截止时间前没有取得令牌或没有被工作任务取出，没有发出."""
+
+
+def remaining_time(deadline: Optional[float]) -> Optional[float]:
+    """距截止时间（事件循环时间）剩余的秒数，没有截止时间时为None."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - asyncio.get_running_loop().time())
+
+
+class FetchEngine:
+    """所有配置条目共用的请求引擎.
+
+    持有共享的HTTP会话、合并层和各位置的协调器，所有请求经同一个工作队列执行，
+    由固定数量的工作任务处理，从而限制全局并发；各位置的首次刷新错开进行。
+    请求先从所属凭据的令牌桶取得令牌，再按优先级进入工作队列。
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.coalescer = RequestCoalescer()
+        # entry_id -> 协调器，归一化后位置相同的配置条目共用同一个协调器
+        self.coordinators: dict = {}
+        # 共享键 -> {"coordinator", "owner", "clients": {entry_id: 客户端}, "first_refresh"}
+        # owner 为协调器当前使用其客户端和存储的配置条目，卸载后交给仍在使用的条目
+        self._shared: dict = {}
+        # (主机, 接口) -> 熔断器，某个接口故障时所有位置一起停止请求
+        self.breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        # 凭据 -> 令牌桶，同一凭据的所有位置共用
+        self.buckets: dict[str, TokenBucket] = {}
+        # (优先级, 序号, 请求, future)
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: list[asyncio.Task] = []
+        self._slot = 0
+        # 请求键 -> LocationID解析失败的时间（monotonic），退避期间不再重试
+        self.lookup_failures: dict[str, float] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共享的长期会话，keep-alive连接在所有位置之间复用."""
+        if self._session is None or self._session.closed:
+            self._session = async_create_clientsession(
+                self._hass, auto_cleanup=False, timeout=aiohttp.ClientTimeout(total=20)
+            )
+        return self._session
+
+    def breaker(self, host: str, endpoint: str) -> CircuitBreaker:
+        """获取主机上某个接口的熔断器，不存在时创建."""
+        breaker = self.breakers.get((host, endpoint))
+        if breaker is None:
+            breaker = self.breakers[(host, endpoint)] = CircuitBreaker(f"{host} {endpoint}")
+        return breaker
+
+    def bucket(self, credential: str, rate: float) -> TokenBucket:
+        """获取凭据的令牌桶，不存在时创建，已存在时更新发放速度."""
+        bucket = self.buckets.get(credential)
+        if bucket is None:
+            bucket = self.buckets[credential] = TokenBucket(credential, rate)
+        else:
+            bucket.configure(rate)
+        return bucket
+
+    def get_shared(self, share_key):
+        """返回共享键相同的已有协调器."""
+        shared = self._shared.get(share_key)
+        return shared["coordinator"] if shared is not None else None
+
+    @staticmethod
+    def create_coordinator(factory: Callable):
+        """在配置条目的上下文之外创建协调器.
+
+        共享的协调器由引擎持有，不能绑定到创建它的配置条目，否则该条目卸载时协调器随之关闭。
+        """
+        token = current_entry.set(None)
+        try:
+            return factory()
+        finally:
+            current_entry.reset(token)
+
+    def register(self, entry_id: str, coordinator, share_key=None, client=None) -> None:
+        self.coordinators[entry_id] = coordinator
+        if share_key is not None:
+            shared = self._shared.setdefault(share_key, {
+                "coordinator": coordinator,
+                "owner": entry_id,
+                "clients": {},
+                "first_refresh": None,
+            })
+            shared["clients"][entry_id] = client
+        self._ensure_workers()
+
+    def _ensure_workers(self) -> None:
+        """启动工作任务；LocationID解析在注册协调器之前进行，也需要工作任务."""
+        if not self._workers:
+            self._workers = [
+                self._hass.async_create_background_task(self._async_worker(), f"{DOMAIN}_fetch_worker_{i}")
+                for i in range(MAX_CONCURRENT_REQUESTS)
+            ]
+
+    async def async_unregister(self, entry_id: str) -> None:
+        """移除位置，最后一个位置移除后停止工作任务并关闭会话.
+
+        共享协调器的所属条目卸载时，协调器改用仍在使用它的条目的客户端和存储；
+        没有条目使用时停止首次刷新和定时刷新，并立即写入未保存的数据。
+        """
+        self.coordinators.pop(entry_id, None)
+        for share_key, shared in list(self._shared.items()):
+            clients = shared["clients"]
+            if entry_id not in clients:
+                continue
+            del clients[entry_id]
+            coordinator = shared["coordinator"]
+            if not clients:
+                del self._shared[share_key]
+                if shared["first_refresh"] is not None:
+                    shared["first_refresh"].cancel()
+                await coordinator.async_shutdown()
+                await coordinator.async_flush_store()
+            elif shared["owner"] == entry_id:
+                owner = min(clients)
+                shared["owner"] = owner
+                await coordinator.async_hand_over(clients[owner], f"{DOMAIN}.{owner}")
+        if self.coordinators:
+            return
+        self.coalescer.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def async_run(
+        self,
+        job: Callable[[Optional[float]], Awaitable],
+        priority: int = DEFAULT_PRIORITY,
+        bucket: Optional[TokenBucket] = None,
+        deadline: Optional[float] = None,
+    ):
+        """取得令牌后把请求按优先级放入工作队列，等待工作任务执行完成后返回结果.
+
+        job(remaining) 在工作任务取出请求时调用，remaining 为此时距 deadline 剩余的秒数，用于计算请求超时；
+        等待令牌和排队都不超过 deadline，到期仍未发出的请求直接放弃并抛出 RequestExpiredError。
+        """
+        if bucket is not None:
+            try:
+                await bucket.async_acquire(priority, remaining_time(deadline))
+            except asyncio.TimeoutError:
+                raise RequestExpiredError from None
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._seq), job, future, deadline))
+        try:
+            done, _ = await asyncio.wait((future,), timeout=remaining_time(deadline))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        if not done:
+            # 已经开始的请求由其自身的超时在截止时间结束，结果不再使用
+            future.cancel()
+            raise RequestExpiredError
+        return future.result()
+
+    async def _async_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job, future, deadline = await self._queue.get()
+            try:
+                # 等待者已取消时不再发出请求
+                if future.done():
+                    continue
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        future.set_exception(RequestExpiredError())
+                        continue
+                try:
+                    result = await job(remaining)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:  # pylint: disable=broad-except
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def async_schedule_first_refresh(self, share_key) -> None:
+        """为位置分配刷新相位并在后台进行首次刷新；首次刷新和之后的定时刷新都按相位错开.
+
+        首次刷新由引擎持有，不随创建协调器的配置条目卸载而取消，最后一个使用者卸载时才取消。
+        """
+        shared = self._shared[share_key]
+        coordinator = shared["coordinator"]
+        phase = (self._slot * PHASE_STEP) % 1
+        self._slot += 1
+        coordinator.set_phase(phase)
+        seconds = phase * STAGGER_WINDOW
+        shared["first_refresh"] = self._hass.async_create_background_task(
+            self._async_first_refresh(coordinator, seconds),
+            f"{DOMAIN}_first_refresh_{coordinator.location}",
+        )
+
+    @staticmethod
+    async def _async_first_refresh(coordinator, seconds) -> None:
+        if seconds:
+            await asyncio.sleep(seconds)
+        await coordinator.async_refresh()
+
+
+def async_get_engine(hass: HomeAssistant) -> FetchEngine:
+    """获取共享的请求引擎，不存在时创建."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    engine = domain_data.get("engine")
+    if engine is None:
+        engine = domain_data["engine"] = FetchEngine(hass)
+    return engine
@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Optional
+
+from .forecast import fx_time_iso
+from .record import SlotRecord
+
+
+class Alert(SlotRecord):
+    """一条灾害预警，预警内容更新时 id 不变."""
+    __slots__ = (
+        "id", "headline", "description", "instruction", "severity", "event_type",
+        "message_type", "sender", "issued", "start", "expire",
+    )
+
+    id: str
+    headline: str
+    description: str
+    instruction: Optional[str]
+    severity: str
+    event_type: Optional[str]
+    message_type: Optional[str]
+    sender: Optional[str]
+    issued: Optional[str]
+    start: Optional[str]
+    expire: Optional[str]
+
+    def __init__(self, id, headline, description, instruction, severity, event_type,
+                 message_type, sender, issued, start, expire):
+        # pylint: disable=redefined-builtin
+        self.id = id
+        self.headline = headline
+        self.description = description
+        self.instruction = instruction
+        self.severity = severity
+        self.event_type = event_type
+        self.message_type = message_type
+        self.sender = sender
+        self.issued = issued
+        self.start = start
+        self.expire = expire
+
+    @classmethod
+    def from_json(cls, alert):
+        headline = alert.get("headline", "")
+        issued = alert.get("issuedTime")
+        return cls(
+            # 没有 id 的旧格式数据以标题和发布时间区分
+            alert.get("id") or f"{headline}@{issued}",
+            headline,
+            alert.get("description", ""),
+            alert.get("instruction"),
+            (alert.get("severity") or "").lower(),
+            (alert.get("eventType") or {}).get("name"),
+            (alert.get("messageType") or {}).get("code"),
+            alert.get("senderName"),
+            issued,
+            alert.get("effectiveTime") or alert.get("onsetTime"),
+            alert.get("expireTime"),
+        )
+
+    @property
+    def cancelled(self) -> bool:
+        """发布方已解除的预警."""
+        return (self.message_type or "").lower() == "cancel"
+
+    def expired(self, now: datetime) -> bool:
+        if not self.expire:
+            return False
+        try:
+            return datetime.fromisoformat(fx_time_iso(self.expire)) <= now
+        except ValueError:
+            return False
+
+    def as_dict(self, detail: bool = True) -> dict:
+        """实体属性和事件中使用的字典，detail 为False时不含正文和防御指南."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        if not detail:
+            del values["description"]
+            del values["instruction"]
+        return values
+
+
+class AlertStore:
+    """按 id 索引当前生效的预警，每次与上一次的集合比较，得出新增、更新和解除的预警."""
+
+    def __init__(self):
+        self.alerts: dict[str, Alert] = {}
+
+    @staticmethod
+    def _active(alerts, now: datetime) -> dict:
+        """已解除或已过期的预警不计入当前集合."""
+        return {
+            alert.id: alert for alert in alerts
+            if not alert.cancelled and not alert.expired(now)
+        }
+
+    def load(self, alerts, now: datetime) -> None:
+        """从缓存恢复上一次的预警，不产生变化；缓存期间已过期的预警直接丢弃."""
+        self.alerts = self._active(alerts, now)
+
+    def update(self, alerts, now: datetime):
+        """用最新的预警替换当前集合，返回 (新增, 更新, 解除) 三个列表.
+
+        已解除或已过期的预警不计入当前集合；之前存在的预警不再出现时视为解除。
+        """
+        current = self._active(alerts, now)
+        new = [alert for alert_id, alert in current.items() if alert_id not in self.alerts]
+        updated = [
+            alert for alert_id, alert in current.items()
+            if alert_id in self.alerts and self.alerts[alert_id] != alert
+        ]
+        expired = [alert for alert_id, alert in self.alerts.items() if alert_id not in current]
+        self.alerts = current
+        return new, updated, expired
@@ -11,11 +11,24 @@ CONF_KEY = "key"
 CONF_STORAGE_PATH = "storage_path"
 CONF_JWT_SUB = "auth_jwt_sub"
 CONF_JWT_KID = "auth_jwt_kid"
+CONF_JWT_LIFETIME = "auth_jwt_lifetime"
 
 DEFAULT_HOST = "devapi.qweather.com"
 
 CONF_DISASTERLEVEL = "disasterlevel"
 CONF_DISASTERMSG = "disastermsg"
+CONF_FORECAST_DAYS = "forecast_days"
+CONF_FORECAST_HOURS = "forecast_hours"
+CONF_MINUTELY = "minutely"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_DAILY_QUOTA = "daily_quota"
+CONF_MINUTE_QUOTA = "minute_quota"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_LOCATION_MODE = "location_mode"
+# 解析得到的LocationID及其对应的坐标，坐标变化后重新解析
+CONF_LOCATION_ID = "location_id"
+CONF_LOCATION_ID_FOR = "location_id_for"
 CONF_SENSOR_LIST = ["air","comf","cw","drsg","flu","sport","trav","uv","sunglass","guomin","liangshai","jiaotong","fangshai","kongtiao","disaster_warn","temprature","humidity","category","feelsLike","text","windDir","windScale","windSpeed","pressure","vis","cloud","dew","precip","qlty","level","primary","pm2p5","pm10","co","so2","no2","o3"]
 
 # config flow
@@ -31,6 +44,46 @@ DISASTER_MSG: dict = {
     "allmsg": "所有信息"
 }
 
+# 预报时长，取值即接口路径 /v7/weather/{取值}
+DEFAULT_FORECAST_DAYS: str = "7d"
+FORECAST_DAYS: dict = {
+    "3d": "3天",
+    "7d": "7天",
+    "10d": "10天",
+    "15d": "15天"
+}
+
+DEFAULT_FORECAST_HOURS: str = "24h"
+FORECAST_HOURS: dict = {
+    "24h": "24小时",
+    "72h": "72小时",
+    "168h": "168小时"
+}
+
+# 位置的请求方式：精确坐标、坐标保留两位小数（和风天气的精度）、解析为LocationID
+# 后两种方式下，归一化后位置相同的配置条目共用一次请求和解析
+DEFAULT_LOCATION_MODE: str = "exact"
+LOCATION_MODES: dict = {
+    "exact": "精确坐标",
+    "round": "坐标保留两位小数",
+    "location_id": "LocationID"
+}
+
+# 是否启用分钟级降水（未来2小时，每5分钟）
+DEFAULT_MINUTELY: bool = False
+
+# 自适应刷新的最小、最大间隔（秒）
+DEFAULT_MIN_INTERVAL: int = 300
+DEFAULT_MAX_INTERVAL: int = 7200
+MIN_POLL_INTERVAL: int = 60
+MAX_POLL_INTERVAL: int = 86400
+
+# 同一KEY或JWT项目的请求额度，0表示不限制
+DEFAULT_DAILY_QUOTA: int = 1000
+DEFAULT_MINUTE_QUOTA: int = 60
+# 每秒发放的请求令牌数，同一凭据的所有位置共用
+DEFAULT_RATE_LIMIT: float = 5
+
 DEFAULT_DISASTER_LEVEL_CONF: str = "3"
 DISASTER_LEVEL_CONF: dict = {
     "1": "标准的",
@@ -59,6 +112,27 @@ CONDITION_CLASSES = {
     'exceptional': ["扬沙", "浮尘", "沙尘暴", "强沙尘暴", "未知"],
 }
 
+# 无法识别的天气统一归为该类，保证预报中的天气与日期一一对应
+CONDITION_DEFAULT = 'exceptional'
+
+# 天气文字 -> HA天气状况，导入时由 CONDITION_CLASSES 反向生成
+CONDITION_TEXT_MAP = {text: cond for cond, texts in CONDITION_CLASSES.items() for text in texts}
+
+# 和风天气图标代码 -> HA天气状况，图标代码不受语言影响，优先使用
+CONDITION_ICON_MAP = {
+    **dict.fromkeys(["100", "150"], 'sunny'),
+    **dict.fromkeys(["101", "151"], 'cloudy'),
+    **dict.fromkeys(["102", "103", "104", "152", "153"], 'partlycloudy'),
+    **dict.fromkeys(["300", "305", "306", "307", "308", "309", "313", "314", "315", "316", "350", "399"], 'rainy'),
+    **dict.fromkeys(["301", "310", "311", "312", "317", "318", "351"], 'pouring'),
+    **dict.fromkeys(["302", "303"], 'lightning-rainy'),
+    "304": 'hail',
+    **dict.fromkeys(["400", "401", "402", "403", "407", "408", "409", "410", "457", "499"], 'snowy'),
+    **dict.fromkeys(["404", "405", "406", "456"], 'snowy-rainy'),
+    **dict.fromkeys(["500", "501", "502", "509", "510", "511", "512", "513", "514", "515"], 'fog'),
+    **dict.fromkeys(["503", "504", "507", "508", "999"], 'exceptional'),
+}
+
 DISASTER_LEVEL = {
     "cancel":0,
     "none":0,
@@ -81,5 +155,18 @@ DISASTER_LEVEL = {
 ATTR_UPDATE_TIME = "更新时间"
 ATTR_SUGGESTION = "建议"
 ATTRIBUTION = "来自和风天气的天气数据"
+# 灾害预警新增、更新或解除时触发的事件
+EVENT_ALERT = "heweather_alert"
 
 CERT_NAME_PREFIX = "heweather_ed25519_"
+# 至多每隔这么多秒检查一次私钥文件是否被修改或创建
+PRI_KEY_CHECK_INTERVAL: int = 60
+
+# JWT有效期（秒），和风天气允许的最长有效期为24小时
+DEFAULT_JWT_LIFETIME: int = 900
+MIN_JWT_LIFETIME: int = 300
+MAX_JWT_LIFETIME: int = 86400
+# 在到期前提前这么多秒重新签发
+JWT_REFRESH_MARGIN: int = 60
+# iat 向前偏移，避免服务器时钟误差导致令牌尚未生效
+JWT_IAT_OFFSET: int = 30
@@ -0,0 +1,92 @@
+from typing import Optional
+
+
+class HeWeatherError(Exception):
+    """和风天气接口返回错误，status 为HTTP状态码或接口返回的 code."""
+
+    def __init__(self, status, message: str = ""):
+        super().__init__(f"status={status} {message}".strip())
+        self.status = status
+
+
+class HeWeatherAuthError(HeWeatherError):
+    """认证失败（401），修改凭据前重试不会成功."""
+
+
+class HeWeatherForbiddenError(HeWeatherError):
+    """无权访问该接口（403），通常是订阅不包含此数据，其他接口不受影响."""
+
+
+class HeWeatherQuotaError(HeWeatherError):
+    """超过额度或余额不足（402）."""
+
+
+class HeWeatherRateLimitError(HeWeatherError):
+    """请求过于频繁（429），retry_after 为服务器要求等待的秒数."""
+
+    def __init__(self, status, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(status, message)
+        self.retry_after = retry_after
+
+
+class HeWeatherLocationError(HeWeatherError):
+    """位置无效或该地区没有此数据（204、400、404）."""
+
+
+class HeWeatherServerError(HeWeatherError):
+    """服务端错误（5xx），可以重试."""
+
+
+class HeWeatherTokenError(HeWeatherError):
+    """无法签发JWT（私钥缺失、不可读或签名失败），请求没有发出；多为暂时的文件错误，可以重试."""
+
+
+# HTTP状态码或接口 code -> 错误类型
+ERROR_TYPES = {
+    204: HeWeatherLocationError,
+    400: HeWeatherLocationError,
+    401: HeWeatherAuthError,
+    402: HeWeatherQuotaError,
+    403: HeWeatherForbiddenError,
+    404: HeWeatherLocationError,
+    429: HeWeatherRateLimitError,
+}
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-After 头，只支持秒数形式."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def error_for(status, message: str = "", retry_after: Optional[float] = None) -> HeWeatherError:
+    """按状态码创建对应类型的错误，未知的 4xx 视为请求本身有问题."""
+    try:
+        code = int(status)
+    except (TypeError, ValueError):
+        return HeWeatherError(status, message)
+    if code == 429:
+        return HeWeatherRateLimitError(status, message, retry_after)
+    if code >= 500:
+        return HeWeatherServerError(status, message)
+    return ERROR_TYPES.get(code, HeWeatherError)(status, message)
+
+
+def check_response(http_status: int, json_data, retry_after: Optional[float] = None) -> None:
+    """解析前检查HTTP状态码和接口返回的 code，有错误时抛出对应类型的错误.
+
+    v7接口在响应体中返回 code，v1接口出错时返回HTTP错误码和 error 对象；
+    先按HTTP状态码判断，204 等已知状态码即使没有响应体也按对应类型处理。
+    """
+    if http_status >= 400 or http_status in ERROR_TYPES:
+        message = ""
+        if isinstance(json_data, dict) and isinstance(json_data.get("error"), dict):
+            message = json_data["error"].get("title") or json_data["error"].get("type") or ""
+        raise error_for(http_status, message, retry_after)
+    if not isinstance(json_data, dict):
+        raise HeWeatherServerError(http_status, "unexpected response body")
+    code = json_data.get("code")
+    if code is not None and code != "200":
+        raise error_for(code, "", retry_after)
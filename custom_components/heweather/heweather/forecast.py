@@ -0,0 +1,111 @@
+from datetime import date, datetime
+from typing import Optional
+
+from .const import (
+    CONDITION_DEFAULT,
+    CONDITION_ICON_MAP,
+    CONDITION_TEXT_MAP,
+)
+from .record import SlotRecord
+
+
+def fx_time_iso(value):
+    """将 fxTime（如 2021-02-16T15:00+08:00）转为带秒的ISO 8601字符串.
+
+    和风天气的时间格式固定，直接按位置切片拼接，比 strptime 快得多。
+    """
+    if len(value) == 22 and value[10] == "T" and value[13] == ":" and value[16] in "+-":
+        return value[:16] + ":00" + value[16:]
+    return datetime.fromisoformat(value).isoformat()
+
+
+def fx_date_iso(value, utc_offset):
+    """将 fxDate（如 2021-02-16）转为当地零点的ISO 8601字符串."""
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        return value + "T00:00:00" + utc_offset
+    return date.fromisoformat(value).isoformat() + "T00:00:00" + utc_offset
+
+
+def utc_offset_of(update_time):
+    """从 updateTime（如 2021-02-16T15:35+08:00）中取出时区偏移."""
+    if update_time and len(update_time) == 22 and update_time[16] in "+-":
+        return update_time[16:]
+    return "+08:00"
+
+
+def resolve_condition(text, icon=None):
+    """将和风天气的图标代码或天气文字转换为HA天气状况."""
+    return CONDITION_ICON_MAP.get(icon) or CONDITION_TEXT_MAP.get(text, CONDITION_DEFAULT)
+
+
+class DailyForecast(SlotRecord):
+    """逐天预报中的一天."""
+    __slots__ = ("time", "condition", "temp_max", "temp_min", "text")
+
+    time: str
+    condition: str
+    temp_max: int
+    temp_min: int
+    text: Optional[str]
+
+    def __init__(self, time, condition, temp_max, temp_min, text):
+        self.time = time
+        self.condition = condition
+        self.temp_max = temp_max
+        self.temp_min = temp_min
+        self.text = text
+
+    @classmethod
+    def from_json(cls, day, utc_offset):
+        return cls(
+            fx_date_iso(day["fxDate"], utc_offset),
+            resolve_condition(day["textDay"], day.get("iconDay")),
+            int(day["tempMax"]),
+            int(day["tempMin"]),
+            day["textDay"],
+        )
+
+
+class HourlyForecast(SlotRecord):
+    """逐小时预报中的一小时."""
+    __slots__ = (
+        "time", "condition", "temp", "humidity", "precip",
+        "wind_dir", "wind_speed", "pop", "text",
+    )
+
+    time: str
+    condition: str
+    temp: float
+    humidity: float
+    precip: float
+    wind_dir: str
+    wind_speed: int
+    pop: Optional[float]
+    text: Optional[str]
+
+    def __init__(self, time, condition, temp, humidity, precip, wind_dir, wind_speed, pop, text):
+        self.time = time
+        self.condition = condition
+        self.temp = temp
+        self.humidity = humidity
+        self.precip = precip
+        self.wind_dir = wind_dir
+        self.wind_speed = wind_speed
+        self.pop = pop
+        self.text = text
+
+    @classmethod
+    def from_json(cls, hour):
+        # pop 在部分地区可能为空字符串
+        pop = hour.get("pop")
+        return cls(
+            fx_time_iso(hour["fxTime"]),
+            resolve_condition(hour["text"], hour.get("icon")),
+            float(hour["temp"]),
+            float(hour["humidity"]),
+            float(hour["precip"]),
+            hour["windDir"],
+            int(hour["windSpeed"]),
+            float(pop) if pop else None,
+            hour["text"],
+        )
@@ -1,5 +1,6 @@
 import base64
 import os
+import time
 import asyncio
 import traceback
 from enum import Enum, auto
@@ -10,7 +11,15 @@ import jwt
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import ed25519
 
-from .const import CERT_NAME_PREFIX
+from .const import (
+    CERT_NAME_PREFIX,
+    PRI_KEY_CHECK_INTERVAL,
+    DEFAULT_JWT_LIFETIME,
+    MIN_JWT_LIFETIME,
+    MAX_JWT_LIFETIME,
+    JWT_REFRESH_MARGIN,
+    JWT_IAT_OFFSET,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -38,12 +47,35 @@ class HeWeatherCert:
     _cert_private_name: str
     _cert_public_name: str
 
+    _jwt_lifetime: int
+    _jwt_cache: dict[tuple[str, str], tuple[str, int]]
+    _jwt_pending: dict[tuple[str, str], asyncio.Task]
+    # 令牌作废时加一，之前开始的签发结果不再缓存
+    _jwt_generation: int
+
+    # 已解析的私钥、私钥文件的修改时间和上次检查的时间，私钥不存在时同样缓存检查结果
+    _pri_key: Optional[ed25519.Ed25519PrivateKey]
+    _pri_key_mtime: Optional[float]
+    _pri_key_checked: Optional[float]
+
     def __init__(
-        self, root_path: str, loop: Optional[asyncio.AbstractEventLoop] = None
+        self,
+        root_path: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        jwt_lifetime: int = DEFAULT_JWT_LIFETIME,
     ) -> None:
         self._main_loop = loop or asyncio.get_running_loop()
         self._file_future = {}
 
+        self._jwt_lifetime = self.__clamp_jwt_lifetime(jwt_lifetime)
+        self._jwt_cache = {}
+        self._jwt_pending = {}
+        self._jwt_generation = 0
+
+        self._pri_key = None
+        self._pri_key_mtime = None
+        self._pri_key_checked = None
+
         self._root_path = os.path.abspath(root_path)
         self._cert_path = os.path.join(self._root_path, "certs")
         os.makedirs(self._cert_path, exist_ok=True)
@@ -107,7 +139,25 @@ class HeWeatherCert:
             self.__add_file_future(path, HeWeatherStorageType.SAVE, fut)
         return await fut
 
+    @staticmethod
+    def __clamp_jwt_lifetime(lifetime: int) -> int:
+        return max(MIN_JWT_LIFETIME, min(int(lifetime), MAX_JWT_LIFETIME))
+
+    def __invalidate_jwt_tokens(self) -> None:
+        # 旧密钥签发的令牌作废，进行中的签发结果不再缓存
+        self._jwt_cache.clear()
+        self._jwt_pending.clear()
+        self._jwt_generation += 1
+
+    def __invalidate_jwt_cache(self) -> None:
+        # 密钥变化后旧令牌和已解析的私钥全部失效
+        self.__invalidate_jwt_tokens()
+        self._pri_key = None
+        self._pri_key_mtime = None
+        self._pri_key_checked = None
+
     def gen_key(self) -> bool:
+        self.__invalidate_jwt_cache()
         prikey = ed25519.Ed25519PrivateKey.generate()
         pubkey = prikey.public_key()
 
@@ -137,6 +187,7 @@ class HeWeatherCert:
                 os.path.join(self._cert_path, self._cert_public_name),
                 f"-----BEGIN PUBLIC KEY-----\n{pubkey_b64}\n-----END PUBLIC KEY-----\n",
             )
+            self.__invalidate_jwt_cache()
             return True
         except Exception as e:
             _LOGGER.error("Failed to generate key: %s", e)
@@ -144,6 +195,7 @@ class HeWeatherCert:
             return False
 
     async def gen_key_async(self) -> bool:
+        self.__invalidate_jwt_cache()
         prikey = ed25519.Ed25519PrivateKey.generate()
         pubkey = prikey.public_key()
 
@@ -173,6 +225,7 @@ class HeWeatherCert:
                 os.path.join(self._cert_path, self._cert_public_name),
                 f"-----BEGIN PUBLIC KEY-----\n{pubkey_b64}\n-----END PUBLIC KEY-----\n",
             )
+            self.__invalidate_jwt_cache()
             return True
         except Exception as e:
             _LOGGER.error("Failed to generate key: %s", e)
@@ -228,6 +281,52 @@ class HeWeatherCert:
             _LOGGER.error("Failed to read private key: %s", e)
             return None
 
+    def __load_pri_key(
+        self, path: str, mtime: Optional[float]
+    ) -> tuple[Optional[ed25519.Ed25519PrivateKey], Optional[float]]:
+        if not os.path.exists(path):
+            _LOGGER.debug("load error, file does not exist, %s", path)
+            return None, None
+        new_mtime = os.path.getmtime(path)
+        if mtime is not None and new_mtime == mtime:
+            # 文件未变化，沿用已解析的私钥
+            return self._pri_key, mtime
+        pem = self.__load(path)
+        if not pem:
+            return None, None
+        key = serialization.load_pem_private_key(pem.encode(), password=None)
+        if not isinstance(key, ed25519.Ed25519PrivateKey):
+            _LOGGER.error("load error, not an ed25519 private key, %s", path)
+            return None, None
+        return key, new_mtime
+
+    async def get_pri_key_obj_async(self) -> Optional[ed25519.Ed25519PrivateKey]:
+        """返回已解析的私钥，每隔 PRI_KEY_CHECK_INTERVAL 秒检查一次文件，修改时间变化时才重新读取.
+
+        私钥不存在或读取失败的结果同样缓存到下次检查，期间不再访问文件。
+        """
+        now = time.monotonic()
+        if self._pri_key_checked is not None and now - self._pri_key_checked < PRI_KEY_CHECK_INTERVAL:
+            return self._pri_key
+        previous = self._pri_key
+        try:
+            key, mtime = await self._main_loop.run_in_executor(
+                None,
+                self.__load_pri_key,
+                os.path.join(self._cert_path, self._cert_private_name),
+                self._pri_key_mtime if self._pri_key is not None else None,
+            )
+        except Exception as e:
+            _LOGGER.error("Failed to read private key: %s", e)
+            key, mtime = None, None
+        self._pri_key, self._pri_key_mtime = key, mtime
+        self._pri_key_checked = now
+        if previous is not None and key is not previous:
+            # 私钥文件被替换或删除，旧私钥签发的令牌会被拒绝
+            _LOGGER.info("Private key changed, invalidate cached JWT tokens")
+            self.__invalidate_jwt_tokens()
+        return self._pri_key
+
     def get_pub_key(self) -> Union[str, None]:
         try:
             return self.__load(os.path.join(self._cert_path, self._cert_public_name))
@@ -253,7 +352,7 @@ class HeWeatherCert:
             return None
 
     async def get_jwt_token_async(self, payload: dict, headers: dict) -> str | None:
-        private_key = await self.get_pri_key_async()
+        private_key = await self.get_pri_key_obj_async()
         if private_key:
             return jwt.encode(payload, private_key, algorithm="EdDSA", headers=headers)
         else:
@@ -282,6 +381,52 @@ class HeWeatherCert:
         headers = {"kid": kid}
         return await self.get_jwt_token_async(payload, headers)
 
+    async def get_jwt_token_heweather_cached_async(
+        self, sub: str, kid: str, lifetime: Optional[int] = None
+    ) -> str | None:
+        """返回 (sub, kid) 缓存的令牌，临近过期时重新签发."""
+        cache_key = (sub, kid)
+        # 返回缓存的令牌前先检查私钥文件是否被替换
+        await self.get_pri_key_obj_async()
+        cached = self._jwt_cache.get(cache_key)
+        if cached and cached[1] - JWT_REFRESH_MARGIN > int(time.time()):
+            return cached[0]
+
+        # 并发的调用共用一次签发
+        task = self._jwt_pending.get(cache_key)
+        if task is None:
+            if lifetime is None:
+                lifetime = self._jwt_lifetime
+            task = self._main_loop.create_task(
+                self.__mint_jwt_token_async(cache_key, self.__clamp_jwt_lifetime(lifetime))
+            )
+            self._jwt_pending[cache_key] = task
+
+            def pending_done(done: asyncio.Task) -> None:
+                # 作废后可能已经开始了新的签发，只移除自己
+                if self._jwt_pending.get(cache_key) is done:
+                    del self._jwt_pending[cache_key]
+
+            task.add_done_callback(pending_done)
+        return await asyncio.shield(task)
+
+    async def __mint_jwt_token_async(
+        self, cache_key: tuple[str, str], lifetime: int
+    ) -> str | None:
+        sub, kid = cache_key
+        # 签发期间私钥发生变化时再签发一次，第一次的令牌可能用的是旧私钥
+        for _ in range(2):
+            await self.get_pri_key_obj_async()
+            generation = self._jwt_generation
+            iat = int(time.time()) - JWT_IAT_OFFSET
+            exp = iat + lifetime
+            token = await self.get_jwt_token_heweather_async(sub, kid, iat, exp)
+            if generation == self._jwt_generation:
+                if token:
+                    self._jwt_cache[cache_key] = (token, exp)
+                break
+        return token
+
     def __remove(self, path: str) -> bool:
         item = Path(path)
         if item.is_file() or item.is_symlink():
@@ -303,10 +448,12 @@ class HeWeatherCert:
         return await fut
 
     def del_key(self) -> None:
+        self.__invalidate_jwt_cache()
         self.__remove(os.path.join(self._cert_path, self._cert_private_name))
         self.__remove(os.path.join(self._cert_path, self._cert_public_name))
 
     async def del_key_async(self) -> None:
+        self.__invalidate_jwt_cache()
         await self.__remove_async(
             os.path.join(self._cert_path, self._cert_private_name)
         )
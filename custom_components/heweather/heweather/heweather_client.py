@@ -0,0 +1,100 @@
+import logging
+from typing import Optional
+
+import aiohttp
+
+from .heweather_cert import HeWeatherCert
+from .errors import HeWeatherTokenError, check_response, parse_retry_after
+
+_LOGGER = logging.getLogger(__name__)
+
+# 条件请求命中（HTTP 304）时返回的标记，表示内容与上次相同
+NOT_MODIFIED = object()
+
+
+class HeWeatherClient:
+    """和风天气HTTP客户端，由一个配置条目持有并在各平台间共享."""
+    _session: aiohttp.ClientSession
+    _close_session: bool
+
+    _heweather_cert: Optional[HeWeatherCert]
+    _jwt_sub: Optional[str]
+    _jwt_kid: Optional[str]
+    _jwt_lifetime: Optional[int]
+
+    # url -> (ETag, Last-Modified)
+    _validators: dict[str, tuple[Optional[str], Optional[str]]]
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        heweather_cert: Optional[HeWeatherCert] = None,
+        jwt_sub: Optional[str] = None,
+        jwt_kid: Optional[str] = None,
+        jwt_lifetime: Optional[int] = None,
+        close_session: bool = True,
+    ) -> None:
+        # session 需要是长期存活的，连接池中的keep-alive连接才能在每次轮询之间复用
+        self._session = session
+        self._close_session = close_session
+        self._heweather_cert = heweather_cert
+        self._jwt_sub = jwt_sub
+        self._jwt_kid = jwt_kid
+        self._jwt_lifetime = jwt_lifetime
+        self._validators = {}
+
+    @property
+    def is_jwt(self) -> bool:
+        return self._heweather_cert is not None
+
+    async def async_get_headers(self) -> Optional[dict]:
+        if not self.is_jwt:
+            return None
+        # 令牌按 (sub, kid) 缓存，到期前复用同一个令牌
+        jwt_token = await self._heweather_cert.get_jwt_token_heweather_cached_async(
+            self._jwt_sub, self._jwt_kid, self._jwt_lifetime
+        )
+        if not jwt_token:
+            # 不发出没有令牌的请求，否则返回的401会被当作凭据错误而停止轮询
+            raise HeWeatherTokenError("jwt", "cannot sign token")
+        return {"Authorization": f"Bearer {jwt_token}"}
+
+    async def async_get_json(
+        self,
+        url: str,
+        conditional: bool = False,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+    ):
+        """请求接口并返回json，conditional为True且服务器返回304时返回NOT_MODIFIED.
+
+        timeout 限制整个请求（包括读取响应体），未指定时使用会话的默认超时；
+        HTTP状态码或接口 code 表示错误时抛出 HeWeatherError 的子类，不返回错误内容。
+        """
+        headers = await self.async_get_headers() or {}
+        if conditional and url in self._validators:
+            etag, last_modified = self._validators[url]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        async with self._session.get(url, headers=headers or None, **kwargs) as response:
+            if response.status == 304:
+                return NOT_MODIFIED
+            try:
+                json_data = await response.json(content_type=None)
+            except ValueError:
+                json_data = None
+            check_response(response.status, json_data, parse_retry_after(response.headers.get("Retry-After")))
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._validators[url] = (etag, last_modified)
+            else:
+                self._validators.pop(url, None)
+            return json_data
+
+    async def async_close(self) -> None:
+        if self._close_session and not self._session.closed:
+            await self._session.close()
+            _LOGGER.debug("heweather client session closed")
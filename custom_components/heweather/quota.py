@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .heweather.const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# 每日用量低于该比例时不放慢刷新
+STRETCH_START_RATIO = 0.5
+# 刷新间隔最多放慢的倍数
+MAX_STRETCH = 8
+# 刚过零点时用量很少，按至少经过这么久计算用量速度
+MIN_DAY_ELAPSED = timedelta(hours=1)
+
+# 用量计数按凭据保存，重启后继续累计当天的用量
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+
+def credential_id(key=None, jwt_sub=None, jwt_kid=None):
+    """同一个KEY或JWT项目的配置条目共用一个额度，KEY只保存摘要."""
+    if key:
+        return "key:" + hashlib.sha256(key.encode()).hexdigest()[:12]
+    return f"jwt:{jwt_sub}:{jwt_kid}"
+
+
+class QuotaManager:
+    """统计一个凭据的请求次数，限制每日和每分钟的请求数，并在额度紧张时放慢刷新.
+
+    预算为0表示不限制。多个配置条目使用同一凭据时，各条目设置的预算取最小值（不计0），
+    即以最严格的设置为准；计数保存在本地，重启后当天的用量继续累计。
+    """
+
+    def __init__(self, credential: str, daily_budget: int = 0, minute_budget: int = 0,
+                 store: Optional[Store] = None):
+        self.credential = credential
+        self.daily_budget = daily_budget
+        self.minute_budget = minute_budget
+        # entry_id -> (每日预算, 每分钟预算)
+        self._budgets: dict[str, tuple[int, int]] = {}
+        self._day = None
+        self.used_today = 0
+        self.rejected_today = 0
+        self._recent: deque[datetime] = deque()
+        self._store = store
+        self._load_task: Optional[asyncio.Task] = None
+
+    def set_budget(self, entry_id: str, daily_budget: int, minute_budget: int) -> None:
+        """记录一个配置条目的预算，生效的预算为所有条目中最严格的."""
+        self._budgets[entry_id] = (daily_budget or 0, minute_budget or 0)
+        self._apply_budgets()
+
+    def remove_budget(self, entry_id: str) -> None:
+        self._budgets.pop(entry_id, None)
+        self._apply_budgets()
+
+    def _apply_budgets(self) -> None:
+        daily = [budget[0] for budget in self._budgets.values() if budget[0]]
+        minute = [budget[1] for budget in self._budgets.values() if budget[1]]
+        self.daily_budget = min(daily, default=0)
+        self.minute_budget = min(minute, default=0)
+
+    async def async_load(self) -> None:
+        """从本地恢复当天的用量，并发调用只读取一次."""
+        if self._store is None:
+            return
+        if self._load_task is None:
+            self._load_task = asyncio.ensure_future(self._async_load())
+        await asyncio.shield(self._load_task)
+
+    async def _async_load(self) -> None:
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        try:
+            day = date.fromisoformat(stored["day"])
+            recent = [dt_util.parse_datetime(value) for value in stored.get("recent", [])]
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.debug("Discard stored quota usage of %s", self.credential)
+            return
+        now = dt_util.utcnow()
+        if day != dt_util.as_local(now).date():
+            return
+        # 读取期间已经发出的请求累加到恢复的用量上
+        self._roll(now)
+        self._day = day
+        self.used_today += int(stored.get("used", 0))
+        self.rejected_today += int(stored.get("rejected", 0))
+        self._recent.extendleft(reversed([value for value in recent if value is not None]))
+        self._roll(now)
+
+    def _data_to_store(self) -> dict:
+        return {
+            "day": self._day.isoformat() if self._day is not None else None,
+            "used": self.used_today,
+            "rejected": self.rejected_today,
+            "recent": [value.isoformat() for value in self._recent],
+        }
+
+    def _save(self) -> None:
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+
+    def _roll(self, now):
+        """跨天时清零，每分钟窗口只保留最近60秒内的请求."""
+        day = dt_util.as_local(now).date()
+        if day != self._day:
+            self._day = day
+            self.used_today = 0
+            self.rejected_today = 0
+        while self._recent and now - self._recent[0] >= timedelta(minutes=1):
+            self._recent.popleft()
+
+    def try_acquire(self, now=None) -> bool:
+        """额度允许时记一次请求并返回True."""
+        now = now or dt_util.utcnow()
+        self._roll(now)
+        if (self.daily_budget and self.used_today >= self.daily_budget) or \
+                (self.minute_budget and len(self._recent) >= self.minute_budget):
+            self.rejected_today += 1
+            self._save()
+            return False
+        self.used_today += 1
+        self._recent.append(now)
+        self._save()
+        return True
+
+    def release(self) -> None:
+        """退回最近一次计数的请求，请求在发出前被放弃时调用."""
+        if self.used_today:
+            self.used_today -= 1
+        if self._recent:
+            self._recent.pop()
+        self._save()
+
+    def used_last_minute(self, now=None) -> int:
+        self._roll(now or dt_util.utcnow())
+        return len(self._recent)
+
+    def stretch_factor(self, now=None) -> float:
+        """按当前用量速度预计全天用量，超出每日预算时按比例放慢刷新."""
+        if not self.daily_budget:
+            return 1.0
+        now = now or dt_util.utcnow()
+        self._roll(now)
+        if self.used_today < self.daily_budget * STRETCH_START_RATIO:
+            return 1.0
+        local = dt_util.as_local(now)
+        elapsed = local - local.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_fraction = max(elapsed, MIN_DAY_ELAPSED) / timedelta(days=1)
+        projected = self.used_today / day_fraction
+        return min(MAX_STRETCH, max(1.0, projected / self.daily_budget))
+
+    def as_dict(self, now=None) -> dict:
+        now = now or dt_util.utcnow()
+        return {
+            "daily_budget": self.daily_budget,
+            "minute_budget": self.minute_budget,
+            "used_today": self.used_today,
+            "used_last_minute": self.used_last_minute(now),
+            "rejected_today": self.rejected_today,
+            "stretch_factor": round(self.stretch_factor(now), 2),
+        }
+
+
+def quota_store_key(credential: str) -> str:
+    """保存用量的文件名，凭据只以摘要出现."""
+    return f"{DOMAIN}.quota_" + hashlib.sha256(credential.encode()).hexdigest()[:12]
+
+
+async def async_get_quota(
+    hass: HomeAssistant, entry_id: str, credential: str, daily_budget: int, minute_budget: int
+) -> QuotaManager:
+    """获取凭据的额度管理器，多个配置条目共用同一个实例，预算取各条目中最严格的."""
+    quotas = hass.data.setdefault(DOMAIN, {}).setdefault("quotas", {})
+    quota = quotas.get(credential)
+    if quota is None:
+        store = Store(hass, STORAGE_VERSION, quota_store_key(credential), atomic_writes=True)
+        quota = quotas[credential] = QuotaManager(credential, store=store)
+    quota.set_budget(entry_id, daily_budget, minute_budget)
+    await quota.async_load()
+    return quota
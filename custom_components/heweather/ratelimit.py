@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# 请求优先级，数值越小越先发出：预警和实时天气优先，生活指数最后
+ENDPOINT_PRIORITIES = {
+    "alert": 0,
+    "now": 0,
+    "minutely": 1,
+    "geo": 1,
+    "hourly": 2,
+    "daily": 2,
+    "air": 2,
+    "indices": 3,
+}
+DEFAULT_PRIORITY = 2
+# 令牌桶容量相当于这么多秒的令牌，允许短时突发
+BURST_SECONDS = 2
+# 收到429但没有 Retry-After 时暂停发放令牌、推迟各接口的秒数
+DEFAULT_PAUSE = 60
+
+
+class TokenBucket:
+    """一个凭据的令牌桶，按固定速度发放请求令牌，等待的请求按优先级取得令牌.
+
+    rate 为每秒令牌数，0表示不限制；收到429时暂停发放，直到 Retry-After 到期。
+    """
+
+    def __init__(self, name: str, rate: float = 0):
+        self.name = name
+        self.rate = float(rate or 0)
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        # 新建的桶是满的
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # (优先级, 序号, future)，序号保证同优先级先到先得
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.pauses = 0
+
+    def configure(self, rate: float) -> None:
+        """修改发放速度，多个配置条目共用时以最后加载的为准.
+
+        只调整速度和容量，已有的令牌和429暂停保留，重新加载配置条目不会得到新的突发额度。
+        """
+        now = time.monotonic()
+        if self.rate and now >= self._paused_until:
+            # 按旧速度结算到现在
+            self._refill(now)
+        self.rate = float(rate or 0)
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self._tokens = min(self._tokens, self.capacity)
+        if now >= self._paused_until:
+            self._updated = now
+        # 等待中的请求按新速度重新计算发放时间
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._schedule()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self) -> bool:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        if not self.rate:
+            return True
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def async_acquire(self, priority: int = DEFAULT_PRIORITY, timeout: Optional[float] = None) -> None:
+        """取得一个令牌，没有令牌时按优先级排队等待，超过 timeout 秒仍未取得时抛出 asyncio.TimeoutError."""
+        if not self._waiters and self._try_take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule()
+        # 超时或取消时 future 被取消，发放令牌时跳过
+        await asyncio.wait_for(future, timeout)
+
+    def pause(self, seconds: float) -> None:
+        """服务器限流时暂停发放令牌，暂停结束后桶从空开始重新积累."""
+        now = time.monotonic()
+        until = now + seconds
+        if until <= self._paused_until:
+            return
+        self.pauses += 1
+        self._paused_until = until
+        self._tokens = 0.0
+        self._updated = until
+        _LOGGER.warning("Requests of %s paused for %.0f s", self.name, seconds)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # 等待者已取消
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        now = time.monotonic()
+        wait = self._paused_until - now
+        if wait <= 0 and self.rate:
+            self._refill(now)
+            wait = (1 - self._tokens) / self.rate
+        self._timer = asyncio.get_running_loop().call_later(max(0.0, wait), self._dispatch)
+
+    def as_dict(self) -> dict:
+        now = time.monotonic()
+        if self.rate and now >= self._paused_until:
+            self._refill(now)
+        return {
+            "rate": self.rate,
+            "tokens": round(self._tokens, 2),
+            "waiting": sum(1 for waiter in self._waiters if not waiter[2].done()),
+            "paused_for": max(0, round(self._paused_until - now)),
+            "pauses": self.pauses,
+        }
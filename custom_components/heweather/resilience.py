@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import aiohttp
+
+from .heweather.errors import HeWeatherError, HeWeatherServerError, HeWeatherTokenError
+
+_LOGGER = logging.getLogger(__name__)
+
+# 一次刷新中单个接口最多尝试的次数（含第一次请求）
+RETRY_ATTEMPTS = 3
+# 第n次重试前随机等待 0 ~ min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n) 秒
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 10.0
+
+# 连续失败这么多次后断开，断开期间的请求直接跳过
+BREAKER_FAILURE_THRESHOLD = 5
+# 断开后等待这么多秒再放行一个试探请求，试探失败时等待时间加倍，最多到 BREAKER_MAX_RESET_TIMEOUT
+BREAKER_RESET_TIMEOUT = 60
+BREAKER_MAX_RESET_TIMEOUT = 1800
+
+# 各接口的超时（秒）：(建立连接, 等待首字节及读取间隔, 整个请求)，整个请求包括读取响应体
+TIMEOUT_PROFILES = {
+    "now": (5, 8, 12),
+    "daily": (5, 10, 15),
+    "hourly": (5, 10, 15),
+    "air": (5, 8, 12),
+    "alert": (5, 8, 12),
+    "indices": (5, 10, 15),
+    "minutely": (5, 8, 12),
+    "geo": (5, 10, 15),
+}
+DEFAULT_TIMEOUT_PROFILE = (5, 10, 15)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def is_retryable(error: Exception) -> bool:
+    """超时、连接错误、服务端错误和JWT签发失败可以重试；限流、认证失败等由调度器处理，立即重试不会成功."""
+    if isinstance(error, HeWeatherError):
+        return isinstance(error, (HeWeatherServerError, HeWeatherTokenError))
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """第attempt次重试前的等待时间，全抖动避免大量位置在同一时刻重试."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def request_timeout(endpoint: str, remaining: Optional[float] = None) -> aiohttp.ClientTimeout:
+    """接口的请求超时，remaining 为本次刷新剩余的时间预算，整个请求不超过该时间."""
+    connect, first_byte, total = TIMEOUT_PROFILES.get(endpoint, DEFAULT_TIMEOUT_PROFILE)
+    if remaining is not None:
+        total = max(0.0, min(total, remaining))
+    return aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=first_byte)
+
+
+class CircuitBreaker:
+    """一个主机上一个接口的熔断器，所有配置条目共用.
+
+    closed: 正常请求；open: 连续失败后断开，跳过所有请求；
+    half_open: 断开一段时间后只放行一个试探请求，成功则恢复，失败则再次断开并加倍等待时间。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        max_reset_timeout: float = BREAKER_MAX_RESET_TIMEOUT,
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._max_reset_timeout = max_reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.last_error: Optional[str] = None
+        self._opened_at: Optional[float] = None
+        self._timeout = reset_timeout
+        self._probing = False
+
+    def allow(self) -> bool:
+        """是否可以发出请求；半开状态下放行的请求结束后必须调用 record_* 或 release."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self._timeout:
+                return False
+            self.state = STATE_HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def release(self) -> None:
+        """试探请求没有发出或没有结果时，允许下一个请求继续试探."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("Circuit %s closed", self.name)
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._timeout = self._reset_timeout
+        self._probing = False
+
+    def record_failure(self, error: Optional[Exception] = None) -> None:
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        if error is not None:
+            self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == STATE_HALF_OPEN:
+            self._timeout = min(self._timeout * 2, self._max_reset_timeout)
+            self._open()
+        elif self.state == STATE_CLOSED and self.consecutive_failures >= self._failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+        _LOGGER.warning(
+            "Circuit %s opened after %s consecutive failures, retry in %s s",
+            self.name, self.consecutive_failures, self._timeout,
+        )
+
+    def as_dict(self) -> dict:
+        retry_in = None
+        if self.state == STATE_OPEN:
+            retry_in = max(0, round(self._timeout - (time.monotonic() - self._opened_at)))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "retry_in": retry_in,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,122 @@
+import logging
+import math
+from datetime import datetime, timedelta
+
+_LOGGER = logging.getLogger(__name__)
+
+# 各接口的发布周期，即和风天气大约多久更新一次数据
+ENDPOINT_INTERVALS = {
+    "now": timedelta(seconds=600),
+    "daily": timedelta(seconds=1800),
+    "hourly": timedelta(seconds=1800),
+    "air": timedelta(seconds=600),
+    "alert": timedelta(seconds=600),
+    "indices": timedelta(seconds=7200),
+    "minutely": timedelta(seconds=600),
+}
+
+# 有预警或即将降水时加快刷新的接口
+VOLATILE_ENDPOINTS = {"now", "hourly", "alert", "minutely"}
+
+# 数据连续未变化时，每次把间隔放大这么多倍，最多放大到发布周期的 MAX_BACKOFF 倍
+BACKOFF_FACTOR = 1.5
+MAX_BACKOFF = 4
+# 预计发布时间之后再等一会儿，避免请求到还没更新的数据
+PUBLISH_LAG = timedelta(seconds=60)
+
+# 分钟级降水的刷新间隔随降水临近程度调整
+MINUTELY_INTERVAL_IMMINENT = timedelta(seconds=300)
+MINUTELY_INTERVAL_EXPECTED = timedelta(seconds=600)
+MINUTELY_INTERVAL_DRY = timedelta(seconds=1800)
+# 降水开始时间距现在不超过该时长时视为即将降水
+MINUTELY_IMMINENT = timedelta(minutes=30)
+
+
+class AdaptiveScheduler:
+    """按数据的发布时间和天气变化程度决定各接口下一次请求的时间."""
+
+    def __init__(self, endpoints, min_interval: timedelta, max_interval: timedelta):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self.intervals: dict[str, timedelta] = {
+            endpoint: self._clamp(ENDPOINT_INTERVALS[endpoint]) for endpoint in endpoints
+        }
+        self.last_fetch: dict[str, datetime] = {}
+        # 刷新时刻在以最小间隔为周期的时间格上的相位（0~1），不同位置的相位不同，刷新互相错开
+        self.phase = 0.0
+
+    def _clamp(self, interval):
+        return max(self._min_interval, min(self._max_interval, interval))
+
+    def restore(self, endpoint, fetched, now) -> bool:
+        """恢复缓存中的请求时间，未超过刷新间隔时返回True."""
+        if fetched is not None and now - fetched < self.intervals[endpoint]:
+            self.last_fetch[endpoint] = fetched
+            return True
+        return False
+
+    def due(self, now):
+        """已到刷新时间的接口."""
+        return [
+            endpoint for endpoint, interval in self.intervals.items()
+            if endpoint not in self.last_fetch or now - self.last_fetch[endpoint] >= interval
+        ]
+
+    def record(self, endpoint, now, changed, published=None, volatile=False, rain_time=None, stretch=1.0):
+        """记录一次成功的请求，并计算该接口下一次请求的间隔.
+
+        changed: 数据是否有更新；published: 数据的发布时间（updateTime）；
+        volatile: 是否有生效的预警或即将降水；rain_time: 分钟级降水中降水开始的时间；
+        stretch: 额度紧张时的放慢倍数，放慢后可以超过最大间隔。
+        """
+        self.last_fetch[endpoint] = now
+        base = ENDPOINT_INTERVALS[endpoint]
+        if endpoint == "minutely":
+            if rain_time is None:
+                base = MINUTELY_INTERVAL_DRY
+            elif rain_time - now <= MINUTELY_IMMINENT:
+                base = MINUTELY_INTERVAL_IMMINENT
+            else:
+                base = MINUTELY_INTERVAL_EXPECTED
+        elif volatile and endpoint in VOLATILE_ENDPOINTS:
+            base = base / 2
+
+        if changed or (volatile and endpoint in VOLATILE_ENDPOINTS):
+            interval = base
+        else:
+            # 天气平稳、数据未变化时逐步放慢
+            interval = min(self.intervals[endpoint] * BACKOFF_FACTOR, base * MAX_BACKOFF)
+
+        # 下一次发布预计在间隔之内时，改为在发布后不久请求
+        if published is not None:
+            expected = published + ENDPOINT_INTERVALS[endpoint] + PUBLISH_LAG
+            if now < expected < now + interval:
+                interval = expected - now
+
+        interval = self._clamp(interval) * stretch
+        if interval != self.intervals[endpoint]:
+            _LOGGER.debug("Interval of %s changed to %s", endpoint, interval)
+        self.intervals[endpoint] = interval
+
+    def defer(self, endpoint, now, delay=None):
+        """接口返回错误时推迟下一次请求，delay为None时推迟最大间隔；之后成功的请求按正常规则重新计算间隔."""
+        self.last_fetch[endpoint] = now
+        self.intervals[endpoint] = max(self._min_interval, delay if delay is not None else self._max_interval)
+        _LOGGER.debug("Defer %s for %s", endpoint, self.intervals[endpoint])
+
+    def back_off(self, endpoint, now, failures):
+        """接口连续失败时按失败次数加倍推迟，从最小间隔开始，最多推迟最大间隔."""
+        delay = self._min_interval * 2 ** min(failures, 16)
+        self.defer(endpoint, now, min(delay, self._max_interval))
+
+    def next_refresh(self, now) -> timedelta:
+        """距离最早到期的接口的时间，不小于最小间隔，并推迟到本位置相位对应的时刻."""
+        next_due = min(
+            (self.last_fetch[endpoint] + interval if endpoint in self.last_fetch else now)
+            for endpoint, interval in self.intervals.items()
+        )
+        target = max(now + self._min_interval, next_due).timestamp()
+        period = self._min_interval.total_seconds()
+        offset = self.phase * period
+        aligned = math.ceil((target - offset) / period) * period + offset
+        return timedelta(seconds=aligned - now.timestamp())